@@ -7,14 +7,10 @@
 
 import streamlit as st
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 
 from config import APP_CONFIG, STYLE_CONFIG
-from model_loader import ModelLoader
-from health_metrics import HealthMetrics
+from model_loader import ModelLoader, get_model_loader
+from health_metrics import HealthMetrics, compute_macros
 from planner import WorkoutPlanner, DietPlanner
 from ui_components import (
     render_header,
@@ -35,18 +31,17 @@ st.set_page_config(
 )
 
 # ─── Inject Custom CSS ────────────────────────────────────────────────────────
-st.markdown(STYLE_CONFIG.CSS, unsafe_allow_html=True)
+st.markdown(STYLE_CONFIG.CSS_MINIFIED, unsafe_allow_html=True)
 
 
-# ─── Load Models (cached) ─────────────────────────────────────────────────────
-@st.cache_resource(show_spinner="Loading AI models...")
-def load_models():
-    return ModelLoader()
+# ─── Models (cached per process by get_model_loader) ──────────────────────────
+MODEL_DIR = "."
 
 
 # ─── Main Application ─────────────────────────────────────────────────────────
 def main():
-    models = load_models()
+    models = get_model_loader(MODEL_DIR)
+    models.show_warnings()
 
     render_header()
 
@@ -66,7 +61,9 @@ def main():
 
     if generate_btn:
         with st.spinner("🤖 Computing your personalized plan..."):
-            plan_data = _compute_plan(user_data, models)
+            plan_data = _compute_plan_cached(
+                _user_data_key(user_data), MODEL_DIR, models
+            )
         st.session_state["plan_data"] = plan_data
         st.session_state["user_data"] = user_data
 
@@ -119,15 +116,29 @@ def _render_landing():
             """, unsafe_allow_html=True)
 
 
+def _user_data_key(user_data: dict) -> tuple:
+    """Hashable (key, value) snapshot of the profile; lists become tuples."""
+    return tuple(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in user_data.items()
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _compute_plan_cached(user_items: tuple, model_dir: str, _models: "ModelLoader") -> dict:
+    """_compute_plan memoised on the profile; _models is skipped by the hasher."""
+    user_data = {k: list(v) if isinstance(v, tuple) else v for k, v in user_items}
+    return _compute_plan(user_data, _models)
+
+
 def _compute_plan(user_data: dict, models: "ModelLoader") -> dict:
     """Central computation pipeline: metrics → models → plans."""
 
     # 1. Derived health metrics
     metrics = HealthMetrics(user_data)
-    bmi = metrics.bmi()
-    bmr = metrics.bmr()
-    tdee = metrics.tdee()
-    bmi_category = metrics.bmi_category()
+    bmi = metrics.bmi
+    bmr = metrics.bmr
+    tdee = metrics.tdee
+    bmi_category = metrics.bmi_category
 
     # 2. Predict fitness level cluster via KMeans
     cluster_features = np.array([[
@@ -159,7 +170,7 @@ def _compute_plan(user_data: dict, models: "ModelLoader") -> dict:
     predicted_calories = models.predict_calories(calorie_features)
 
     # 4. Macro split based on goal
-    macros = _compute_macros(predicted_calories, user_data["fitness_goal"])
+    macros = compute_macros(predicted_calories, user_data["fitness_goal"])
 
     # 5. NLP embedding similarity (if free-text provided)
     embedding_notes = []
@@ -213,24 +224,5 @@ def _cluster_to_fitness_level(cluster: int) -> str:
     return mapping.get(cluster % 4, "Intermediate")
 
 
-def _compute_macros(calories: float, goal: str) -> dict:
-    splits = {
-        "Weight Loss":       {"protein": 0.35, "carbs": 0.35, "fat": 0.30},
-        "Muscle Gain":       {"protein": 0.30, "carbs": 0.45, "fat": 0.25},
-        "Endurance":         {"protein": 0.20, "carbs": 0.55, "fat": 0.25},
-        "General Fitness":   {"protein": 0.25, "carbs": 0.45, "fat": 0.30},
-        "Maintenance":       {"protein": 0.25, "carbs": 0.45, "fat": 0.30},
-    }
-    split = splits.get(goal, splits["General Fitness"])
-    return {
-        "protein_g":  round((calories * split["protein"]) / 4, 1),
-        "carbs_g":    round((calories * split["carbs"])   / 4, 1),
-        "fat_g":      round((calories * split["fat"])     / 9, 1),
-        "protein_pct": split["protein"],
-        "carbs_pct":   split["carbs"],
-        "fat_pct":     split["fat"],
-    }
-
-
 if __name__ == "__main__":
     main()
@@ -7,14 +7,10 @@
 
 import streamlit as st
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 
 from config import APP_CONFIG, STYLE_CONFIG
-from model_loader import ModelLoader
-from health_metrics import HealthMetrics
+from model_loader import ModelLoader, get_model_loader
+from health_metrics import HealthMetrics, compute_macros
 from planner import WorkoutPlanner, DietPlanner
 from ui_components import (
     render_header,
@@ -26,6 +22,16 @@ from ui_components import (
     render_explainability_section,
 )
 
+# Column of each activity level's one-hot slot in ModelLoader.SCALER_COLUMNS
+# (columns 0 and 1 hold age and bmi)
+ACTIVITY_OHE_IDX = {
+    "Very Active":       2,   # activity_level_active
+    "Lightly Active":    3,   # activity_level_light
+    "Moderately Active": 4,   # activity_level_moderate
+    "Sedentary":         5,   # activity_level_sedentary
+    "Extremely Active":  6,   # activity_level_very active
+}
+
 # ─── Page Configuration ───────────────────────────────────────────────────────
 st.set_page_config(
     page_title="AI Fitness Planner",
@@ -35,18 +41,17 @@ st.set_page_config(
 )
 
 # ─── Inject Custom CSS ────────────────────────────────────────────────────────
-st.markdown(STYLE_CONFIG.CSS, unsafe_allow_html=True)
+st.markdown(STYLE_CONFIG.CSS_MINIFIED, unsafe_allow_html=True)
 
 
-# ─── Load Models (cached) ─────────────────────────────────────────────────────
-@st.cache_resource(show_spinner="Loading AI models...")
-def load_models():
-    return ModelLoader()
+# ─── Models (cached per process by get_model_loader) ──────────────────────────
+MODEL_DIR = "."
 
 
 # ─── Main Application ─────────────────────────────────────────────────────────
 def main():
-    models = load_models()
+    models = get_model_loader(MODEL_DIR)
+    models.show_warnings()
 
     render_header()
 
@@ -66,7 +71,9 @@ def main():
 
     if generate_btn:
         with st.spinner("🤖 Computing your personalized plan..."):
-            plan_data = _compute_plan(user_data, models)
+            plan_data = _compute_plan_cached(
+                _user_data_key(user_data), MODEL_DIR, models
+            )
         st.session_state["plan_data"] = plan_data
         st.session_state["user_data"] = user_data
 
@@ -119,38 +126,41 @@ def _render_landing():
             """, unsafe_allow_html=True)
 
 
+def _user_data_key(user_data: dict) -> tuple:
+    """Hashable (key, value) snapshot of the profile; lists become tuples."""
+    return tuple(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in user_data.items()
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _compute_plan_cached(user_items: tuple, model_dir: str, _models: "ModelLoader") -> dict:
+    """_compute_plan memoised on the profile; _models is skipped by the hasher."""
+    user_data = {k: list(v) if isinstance(v, tuple) else v for k, v in user_items}
+    return _compute_plan(user_data, _models)
+
+
 def _compute_plan(user_data: dict, models: "ModelLoader") -> dict:
     """Central computation pipeline: metrics → models → plans."""
 
     # 1. Derived health metrics
     metrics = HealthMetrics(user_data)
-    bmi = metrics.bmi()
-    bmr = metrics.bmr()
-    tdee = metrics.tdee()
-    bmi_category = metrics.bmi_category()
+    bmi = metrics.bmi
+    bmr = metrics.bmr
+    tdee = metrics.tdee
+    bmi_category = metrics.bmi_category
 
     # 2. Predict fitness level cluster via KMeans
     # Features must match training exactly:
     # age, bmi,
     # activity_level_active, activity_level_light, activity_level_moderate,
     # activity_level_sedentary, activity_level_very active  (one-hot)
-    activity = user_data["activity_level"]
-    activity_ohe = {
-        "activity_level_active":      1 if activity == "Very Active"        else 0,
-        "activity_level_light":       1 if activity == "Lightly Active"     else 0,
-        "activity_level_moderate":    1 if activity == "Moderately Active"  else 0,
-        "activity_level_sedentary":   1 if activity == "Sedentary"          else 0,
-        "activity_level_very active": 1 if activity == "Extremely Active"   else 0,
-    }
-    cluster_features = np.array([[
-        user_data["age"],
-        bmi,
-        activity_ohe["activity_level_active"],
-        activity_ohe["activity_level_light"],
-        activity_ohe["activity_level_moderate"],
-        activity_ohe["activity_level_sedentary"],
-        activity_ohe["activity_level_very active"],
-    ]])
+    cluster_features = np.zeros((1, 7), dtype=np.float32)
+    cluster_features[0, 0] = user_data["age"]
+    cluster_features[0, 1] = bmi
+    ohe_idx = ACTIVITY_OHE_IDX.get(user_data["activity_level"])
+    if ohe_idx is not None:
+        cluster_features[0, ohe_idx] = 1.0
     scaled_features = models.scale(cluster_features)
     fitness_cluster = models.predict_cluster(scaled_features)
     fitness_level = _cluster_to_fitness_level(fitness_cluster)
@@ -170,7 +180,7 @@ def _compute_plan(user_data: dict, models: "ModelLoader") -> dict:
     predicted_calories = models.predict_calories(calorie_features)
 
     # 4. Macro split based on goal
-    macros = _compute_macros(predicted_calories, user_data["fitness_goal"])
+    macros = compute_macros(predicted_calories, user_data["fitness_goal"])
 
     # 5. NLP embedding similarity (if free-text provided)
     embedding_notes = []
@@ -224,24 +234,5 @@ def _cluster_to_fitness_level(cluster: int) -> str:
     return mapping.get(cluster % 4, "Intermediate")
 
 
-def _compute_macros(calories: float, goal: str) -> dict:
-    splits = {
-        "Weight Loss":       {"protein": 0.35, "carbs": 0.35, "fat": 0.30},
-        "Muscle Gain":       {"protein": 0.30, "carbs": 0.45, "fat": 0.25},
-        "Endurance":         {"protein": 0.20, "carbs": 0.55, "fat": 0.25},
-        "General Fitness":   {"protein": 0.25, "carbs": 0.45, "fat": 0.30},
-        "Maintenance":       {"protein": 0.25, "carbs": 0.45, "fat": 0.30},
-    }
-    split = splits.get(goal, splits["General Fitness"])
-    return {
-        "protein_g":  round((calories * split["protein"]) / 4, 1),
-        "carbs_g":    round((calories * split["carbs"])   / 4, 1),
-        "fat_g":      round((calories * split["fat"])     / 9, 1),
-        "protein_pct": split["protein"],
-        "carbs_pct":   split["carbs"],
-        "fat_pct":     split["fat"],
-    }
-
-
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 """config.py — App configuration and global CSS."""
 
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -10,6 +11,15 @@ class _AppConfig:
     MODEL_DIR: str = "."  # Directory where .pkl files reside
 
 
+def _minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a <style> block."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
 @dataclass
 class _StyleConfig:
     CSS: str = """
@@ -142,6 +152,15 @@ html, body, [class*="css"] {
 }
 
 /* ── Metric Cards ─────────────────────────────────────────────────────────── */
+.metric-grid {
+    display: grid;
+    grid-template-columns: repeat(4, minmax(0, 1fr));
+    gap: 1rem;
+}
+.metric-grid.cols-3 { grid-template-columns: repeat(3, minmax(0, 1fr)); }
+@media (max-width: 640px) {
+    .metric-grid, .metric-grid.cols-3 { grid-template-columns: 1fr; }
+}
 .metric-card {
     background: var(--surface2);
     border: 1px solid var(--border);
@@ -281,6 +300,21 @@ html, body, [class*="css"] {
     color: var(--text) !important;
 }
 
+/* ── Pipeline Steps ───────────────────────────────────────────────────────── */
+.pipeline-step {
+    background: var(--surface2);
+    border: 1px solid var(--border);
+    border-radius: var(--radius);
+    padding: 0.7rem 1rem;
+    margin: 0.5rem 0;
+}
+.pipeline-step summary {
+    cursor: pointer;
+    font-size: 0.92rem;
+    color: var(--text);
+}
+.pipeline-step[open] summary { margin-bottom: 0.6rem; }
+
 /* ── Tabs ─────────────────────────────────────────────────────────────────── */
 [data-testid="stTabs"] [role="tablist"] {
     gap: 0.5rem;
@@ -330,6 +364,11 @@ html, body, [class*="css"] {
 .js-plotly-plot .plotly, .plot-container { background: transparent !important; }
 </style>
 """
+    # Re-sent to the browser on every Streamlit rerun, so keep it compact
+    CSS_MINIFIED: str = field(init=False)
+
+    def __post_init__(self):
+        self.CSS_MINIFIED = _minify_css(self.CSS)
 
 
 APP_CONFIG = _AppConfig()
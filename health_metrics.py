@@ -1,5 +1,10 @@
 """health_metrics.py — BMI, BMR, TDEE and related computations."""
 
+from bisect import bisect_right
+from functools import cached_property
+
+import numpy as np
+
 ACTIVITY_MULTIPLIERS = {
     "Sedentary":        1.2,
     "Lightly Active":   1.375,
@@ -17,8 +22,26 @@ BMI_CATEGORIES = [
     (40.0, 999,  "Obese Class III","🔴"),
 ]
 
+# Bucket boundaries/labels derived from BMI_CATEGORIES for bisection lookups
+_BMI_BOUNDS = tuple(hi for _, hi, _, _ in BMI_CATEGORIES[:-1])
+_BMI_LABELS = tuple(label for _, _, label, _ in BMI_CATEGORIES)
+_BMI_EMOJIS = tuple(emoji for _, _, _, emoji in BMI_CATEGORIES)
+_BMI_MIN, _BMI_MAX = BMI_CATEGORIES[0][0], BMI_CATEGORIES[-1][1]
+
+# Calorie share of (protein, carbs, fat) per goal, and kcal per gram of each
+_MACRO_SPLITS = {
+    "Weight Loss":       np.array([0.35, 0.35, 0.30]),
+    "Muscle Gain":       np.array([0.30, 0.45, 0.25]),
+    "Endurance":         np.array([0.20, 0.55, 0.25]),
+    "General Fitness":   np.array([0.25, 0.45, 0.30]),
+    "Maintenance":       np.array([0.25, 0.45, 0.30]),
+}
+_MACRO_KCAL_PER_G = np.array([4.0, 4.0, 9.0])
+
 
 class HealthMetrics:
+    """Derived metrics for one profile; each value is computed once and cached."""
+
     def __init__(self, user_data: dict):
         self.age      = user_data["age"]
         self.gender   = user_data["gender"]
@@ -26,18 +49,28 @@ class HealthMetrics:
         self.weight   = user_data["weight_kg"]       # kg
         self.activity = user_data["activity_level"]
         self.goal     = user_data["fitness_goal"]
+        self._activity_mult = ACTIVITY_MULTIPLIERS.get(self.activity, 1.55)
 
+    @cached_property
     def bmi(self) -> float:
         h_m = self.height / 100
         return self.weight / (h_m ** 2)
 
+    @cached_property
+    def _bmi_bucket(self) -> tuple[str, str, float]:
+        b = self.bmi
+        if not _BMI_MIN <= b < _BMI_MAX:
+            return "Unknown", "⚪", round(b, 1)
+        i = bisect_right(_BMI_BOUNDS, b)
+        return _BMI_LABELS[i], _BMI_EMOJIS[i], round(b, 1)
+
+    @property
     def bmi_category(self) -> dict:
-        b = self.bmi()
-        for lo, hi, label, emoji in BMI_CATEGORIES:
-            if lo <= b < hi:
-                return {"label": label, "emoji": emoji, "value": round(b, 1)}
-        return {"label": "Unknown", "emoji": "⚪", "value": round(b, 1)}
+        # The bucket is cached; callers get a fresh dict they are free to edit
+        label, emoji, value = self._bmi_bucket
+        return {"label": label, "emoji": emoji, "value": value}
 
+    @cached_property
     def bmr(self) -> float:
         """Harris-Benedict revised equation."""
         if self.gender == "Male":
@@ -45,19 +78,36 @@ class HealthMetrics:
         else:
             return 447.593 + (9.247 * self.weight) + (3.098 * self.height) - (4.330 * self.age)
 
+    @cached_property
     def tdee(self) -> float:
-        multiplier = ACTIVITY_MULTIPLIERS.get(self.activity, 1.55)
-        return self.bmr() * multiplier
+        return self.bmr * self._activity_mult
 
+    @cached_property
     def ideal_weight_range(self) -> tuple[float, float]:
         """BMI 18.5–24.9 → kg range."""
         h_m = self.height / 100
         return round(18.5 * h_m**2, 1), round(24.9 * h_m**2, 1)
 
+    @cached_property
     def body_fat_estimate(self) -> float:
         """U.S. Navy formula approximation using BMI."""
-        b = self.bmi()
+        b = self.bmi
         if self.gender == "Male":
             return round(1.20 * b + 0.23 * self.age - 16.2, 1)
         else:
             return round(1.20 * b + 0.23 * self.age - 5.4, 1)
+
+
+def compute_macros(calories: float, goal: str) -> dict:
+    """Daily macro grams and calorie shares for a goal (General Fitness if unknown)."""
+    split = _MACRO_SPLITS.get(goal, _MACRO_SPLITS["General Fitness"])
+    protein_g, carbs_g, fat_g = (calories * split / _MACRO_KCAL_PER_G).tolist()
+    protein_pct, carbs_pct, fat_pct = split.tolist()
+    return {
+        "protein_g":  round(protein_g, 1),
+        "carbs_g":    round(carbs_g, 1),
+        "fat_g":      round(fat_g, 1),
+        "protein_pct": protein_pct,
+        "carbs_pct":   carbs_pct,
+        "fat_pct":     fat_pct,
+    }
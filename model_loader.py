@@ -2,9 +2,12 @@
 
 import os
 import sys
+import math
 import types
 import pickle
+import hashlib
 import logging
+from contextlib import nullcontext
 import numpy as np
 import pandas as pd
 import streamlit as st
@@ -18,6 +21,20 @@ try:
 except ImportError:
     _JOBLIB_LOAD = None
 
+# ─── Optional torch: no-autograd encoding and int8 quantisation ───────────────
+try:
+    import torch
+    _inference_mode = torch.inference_mode
+except ImportError:
+    torch = None
+    _inference_mode = nullcontext
+
+# ─── Optional SIMD cosine kernel, falls back to a NumPy GEMV ──────────────────
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
 
 # ─── Inject stub modules for removed sentence_transformers submodules ─────────
 def _inject_missing_submodules():
@@ -59,17 +76,38 @@ class _SafeUnpickler(pickle.Unpickler):
             })
 
 
+def _newer_or_orphan(derived: str, source: str) -> bool:
+    """True if derived exists and source is missing or not newer than it."""
+    try:
+        derived_mtime = os.path.getmtime(derived)
+    except OSError:
+        return False
+    try:
+        return derived_mtime >= os.path.getmtime(source)
+    except OSError:
+        return True
+
+
 def _safe_load(path: str):
     """
     1. Inject missing submodule stubs.
-    2. Try joblib/pickle normally.
-    3. Fall back to _SafeUnpickler if an ImportError / ModuleNotFoundError occurs.
+    2. Try joblib/pickle normally, preferring an up-to-date .joblib export
+       (see export_joblib), whose arrays are memory-mapped read-only. A
+       corrupt or truncated export falls back to the source pickle.
+    3. Fall back to _SafeUnpickler on the source pickle if an
+       ImportError / ModuleNotFoundError occurs.
     """
     _inject_missing_submodules()
+    export_path = os.path.splitext(path)[0] + ".joblib"
 
     # First attempt — normal load
     try:
         if _JOBLIB_LOAD:
+            if _newer_or_orphan(export_path, path):
+                try:
+                    return _JOBLIB_LOAD(export_path, mmap_mode="r")
+                except Exception as e:
+                    logger.warning(f"Export {export_path} unreadable ({e}), loading {path}")
             return _JOBLIB_LOAD(path)
         with open(path, "rb") as f:
             return pickle.load(f)
@@ -81,6 +119,58 @@ def _safe_load(path: str):
         return _SafeUnpickler(f).load()
 
 
+def _cosine_scores(queries: np.ndarray, bank: np.ndarray) -> np.ndarray:
+    """
+    (B, N) cosine similarities of float32 query rows against the bank.
+
+    Both sides must already be unit length: every caller encodes with
+    normalize_embeddings=True, so the score is a plain dot product and no
+    norm is recomputed per call.
+    """
+    queries = np.atleast_2d(queries)
+    if simsimd is not None:
+        dist = simsimd.cdist(queries, bank, metric="cosine")
+        return 1.0 - np.asarray(dist, dtype=np.float32)
+    return queries @ bank.T
+
+
+def _search(queries: np.ndarray, bank: np.ndarray, k: int = 3, threshold: float = 0.25) -> list:
+    """
+    For each query row, indices of its top-k bank rows scoring above
+    threshold, best first. All queries are scored in one GEMM, so a batch
+    streams the bank through the cache once.
+    """
+    sims = _cosine_scores(queries, bank)
+    k = min(k, sims.shape[1])
+    top = np.argpartition(sims, -k, axis=1)[:, -k:]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(top_sims, axis=1)[:, ::-1]
+    top = np.take_along_axis(top, order, axis=1)
+    top_sims = np.take_along_axis(top_sims, order, axis=1)
+    return [row[row_sims > threshold].tolist() for row, row_sims in zip(top, top_sims)]
+
+
+def _quantize_encoder(model):
+    """
+    Swap a CPU SentenceTransformer's Linear layers for dynamic int8 ones.
+
+    Returns the model unchanged without torch, for anything that is not a
+    transformer-backed SentenceTransformer, or when it runs on a GPU.
+    """
+    if torch is None or not hasattr(model, "_first_module"):
+        return model
+    if str(getattr(model, "device", "cpu")) != "cpu":
+        return model
+    try:
+        first = model._first_module()
+        first.auto_model = torch.ao.quantization.quantize_dynamic(
+            first.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    except Exception as e:
+        logger.warning(f"Encoder quantisation skipped ({e})")
+    return model
+
+
 # ─── Stub classes ─────────────────────────────────────────────────────────────
 class _StubScaler:
     def transform(self, X):
@@ -90,28 +180,79 @@ class _StubScaler:
 class _StubKMeans:
     def predict(self, X):
         arr = X.values if hasattr(X, "values") else np.asarray(X)
-        return (np.sum(arr, axis=1) % 4).astype(int)
+        if arr.shape[0] == 1:
+            # Single-row fast path (the app's only case): scalar floor and mask
+            return np.array([math.floor(arr[0].sum()) & 3])
+        # floor first so negative sums land in the same bucket as the old "% 4"
+        return np.floor(np.add.reduce(arr, axis=1)).astype(np.int64) & 3
 
 
 class _StubPreprocessor:
     def transform(self, df):
-        return df.values if hasattr(df, "values") else np.array(df)
+        if isinstance(df, pd.DataFrame):
+            return df.to_numpy(copy=False)
+        return np.asarray(df)
 
 
 class _StubDTR:
     def predict(self, X):
         arr = X.values if hasattr(X, "values") else np.asarray(X)
         if arr.ndim == 2 and arr.shape[1] > 0:
-            return arr[:, 0] * np.random.uniform(0.95, 1.05, size=arr.shape[0])
+            # Deterministic so identical profiles give identical (cacheable) plans
+            return arr[:, 0].astype(np.float64)
         return np.array([2000.0])
 
 
+# Fixed projection from 256 hash bits (as ±1) to the 384-dim embedding space.
+# 256 rather than 64 bits keeps unrelated texts' cosine well under the 0.25
+# match threshold (std ~1/16 instead of ~1/8).
+_STUB_HASH_BITS = 256
+_STUB_PROJ = np.random.default_rng(0).standard_normal(
+    (_STUB_HASH_BITS, 384)
+).astype(np.float32)
+
+
 class _StubSentenceTransformer:
-    def encode(self, sentences, **kwargs):
-        n = len(sentences) if isinstance(sentences, list) else 1
-        rng = np.random.default_rng(abs(hash(str(sentences))) % (2**32))
-        vecs = rng.standard_normal((n, 384))
-        return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-9)
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        """Unit-length pseudo-embeddings: a 256-bit hash of each text, projected.
+
+        hashlib (unlike hash()) is not salted per process, so the same text maps
+        to the same vector across runs. Output is always normalised.
+        """
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        digests = b"".join(
+            hashlib.blake2b(s.encode(), digest_size=_STUB_HASH_BITS // 8).digest()
+            for s in sentences
+        )
+        bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, _STUB_HASH_BITS)
+        vecs = (bits.astype(np.float32) * 2 - 1) @ _STUB_PROJ
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs /= np.clip(norms, 1e-9, None, out=norms)
+        return vecs
+
+
+# ─── Preference candidates (static, so encoded once per loader) ──────────────
+_CANDIDATE_BANK = (
+    "Avoid high-impact exercises due to knee pain; substitute with low-impact alternatives.",
+    "Incorporate swimming or cycling for cardiovascular training.",
+    "Focus on upper-body exercises only to protect lower back injury.",
+    "Add yoga and mobility work for flexibility improvement.",
+    "Include daily stretching routine for injury prevention.",
+    "Prefer plant-based protein sources like lentils, tofu, and tempeh.",
+    "Avoid gluten-containing foods; use rice and quinoa as carb bases.",
+    "Incorporate high-fibre vegetables for digestive health.",
+    "Reduce sodium intake; focus on whole, unprocessed foods.",
+    "Include omega-3 rich foods like flaxseed and walnuts.",
+    "Prefer spicy cuisine; incorporate jalapeños and hot sauce.",
+    "Focus on quick-prep meals under 20 minutes.",
+    "Batch-cook on Sundays for the week ahead.",
+    "Include intermittent fasting window (16:8).",
+    "Focus on progressive overload with barbell compound movements.",
+    "Use resistance bands as primary equipment for home workouts.",
+    "Incorporate HIIT sessions three times per week.",
+    "Prioritise recovery; include active rest days with walking.",
+)
 
 
 # ─── ModelLoader ──────────────────────────────────────────────────────────────
@@ -148,19 +289,33 @@ class ModelLoader:
         self._warnings: list = []
         self._model_dir = model_dir
         self._load_all()
-        if self._warnings:
-            with st.sidebar:
-                st.warning(
-                    "⚠️ **Demo mode** — some model files were not found.\n"
-                    "Stub predictions are being used:\n"
-                    + "\n".join(f"- `{w}`" for w in self._warnings)
-                )
+        self._precompute_candidates()
+        # A scaler fitted on a DataFrame checks column names, so it gets one
+        self._scaler_named = hasattr(self._models["scaler"], "feature_names_in_")
+        # Column order the fitted preprocessor expects (None for stubs)
+        prep_cols = getattr(self._models["calorie_preprocessor"], "feature_names_in_", None)
+        self._prep_cols = list(prep_cols) if prep_cols is not None else None
+        # Rendered on every rerun, so the markdown is built once here
+        self._warning_md = (
+            "⚠️ **Demo mode** — some model files were not found.\n"
+            "Stub predictions are being used:\n"
+            + "\n".join(f"- `{w}`" for w in self._warnings)
+        ) if self._warnings else ""
+
+    def show_warnings(self):
+        """Flag stubbed models in the sidebar; call on every script run."""
+        if self._warning_md:
+            st.sidebar.warning(self._warning_md)
 
     def _load_all(self):
         for key, filename in self.MODEL_FILES.items():
             path = os.path.join(self._model_dir, filename)
             try:
                 self._models[key] = _safe_load(path)
+                if hasattr(self._models[key], "eval"):
+                    self._models[key].eval()   # torch modules: no dropout at inference
+                if key == "sentence_transformer":
+                    self._models[key] = _quantize_encoder(self._models[key])
                 logger.info(f"✅ Loaded {filename}")
             except FileNotFoundError:
                 self._models[key] = self.STUBS[key]
@@ -171,27 +326,66 @@ class ModelLoader:
                 self._warnings.append(f"{filename} (error: {e})")
                 logger.error(f"❌ Error loading {filename}: {e}")
 
+    def _precompute_candidates(self):
+        """Encode and L2-normalise the static candidate bank once per loader.
+
+        Embeddings are kept as float32: half the size of the stub's float64
+        output, and still BLAS-backed (NumPy has no fast float16 matmul).
+        On failure the embeddings are left unset and the first
+        match_preferences call encodes them together with its query.
+        """
+        model = self._models["sentence_transformer"]
+        self._cand_bank = _CANDIDATE_BANK
+        try:
+            with _inference_mode():
+                # One forward pass for the whole bank, kept as a contiguous (N, 384) matrix
+                self._cand_embs = np.ascontiguousarray(model.encode(
+                    list(self._cand_bank), batch_size=len(self._cand_bank),
+                    show_progress_bar=False, convert_to_numpy=True,
+                    normalize_embeddings=True,
+                ), dtype=np.float32)
+        except Exception as e:
+            self._cand_embs = None
+            logger.warning(f"Candidate precompute failed ({e}) — deferring to first query")
+
     # ── Public API ────────────────────────────────────────────────────────────
 
     def scale(self, features: np.ndarray) -> np.ndarray:
-        df = pd.DataFrame(features, columns=self.SCALER_COLUMNS)
-        return self._models["scaler"].transform(df)
+        if self._scaler_named:
+            # Wraps the array without copying; sklearn still validates the names
+            features = pd.DataFrame(features, columns=self.SCALER_COLUMNS, copy=False)
+        return self._models["scaler"].transform(features)
 
     def predict_cluster(self, scaled_features: np.ndarray) -> int:
-        df = pd.DataFrame(scaled_features, columns=self.SCALER_COLUMNS)
-        return int(self._models["kmeans"].predict(df)[0])
+        kmeans = self._models["kmeans"]
+        # Fitted KMeans only accepts its own centroid dtype (float64 here)
+        centers = getattr(kmeans, "cluster_centers_", None)
+        if centers is not None:
+            scaled_features = np.asarray(scaled_features, dtype=centers.dtype)
+        return int(kmeans.predict(scaled_features)[0])
 
     def preprocess_calories(self, feature_dict: dict) -> np.ndarray:
-        df = pd.DataFrame([feature_dict])
         prep = self._models["calorie_preprocessor"]
+        if isinstance(prep, _StubPreprocessor):
+            # The stub only passes the raw row through — no DataFrame needed
+            return np.array([list(feature_dict.values())], dtype=object)
         try:
+            if self._prep_cols is not None:
+                row = [feature_dict[c] for c in self._prep_cols]
+                df = pd.DataFrame([row], columns=self._prep_cols)
+            else:
+                df = pd.DataFrame([feature_dict])
             return prep.transform(df)
         except Exception:
-            return df.select_dtypes(include=[np.number]).values
+            # Numeric features only, as select_dtypes(include=[np.number]) would keep
+            return np.array([[
+                v for v in feature_dict.values()
+                if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+            ]])
 
     def predict_calories(self, processed_features: np.ndarray) -> float:
-        result = self._models["dtr"].predict(processed_features)
-        return float(np.clip(result[0], 1200, 6000))
+        v = self._models["dtr"].predict(processed_features)[0]
+        return 1200.0 if v < 1200 else 6000.0 if v > 6000 else float(v)
 
     def match_preferences(
         self,
@@ -199,38 +393,68 @@ class ModelLoader:
         fitness_level: str,
         fitness_goal: str,
     ) -> list:
+        return self.match_preferences_batch([free_text], [fitness_level], [fitness_goal])[0]
+
+    def match_preferences_batch(
+        self,
+        free_texts: list,
+        fitness_levels: list,
+        fitness_goals: list,
+    ) -> list:
+        """match_preferences for many texts: one encode call and one GEMM."""
+        if not free_texts:
+            return []
+        n = len(free_texts)
         model = self._models["sentence_transformer"]
-        candidates = self._build_candidate_bank(fitness_level, fitness_goal)
-
-        query_emb  = model.encode([free_text])
-        cand_embs  = model.encode(candidates)
-
-        q_norm = query_emb / (np.linalg.norm(query_emb, axis=1, keepdims=True) + 1e-9)
-        c_norm = cand_embs / (np.linalg.norm(cand_embs, axis=1, keepdims=True) + 1e-9)
-        sims   = (q_norm @ c_norm.T).flatten()
-
-        top_idx = np.argsort(sims)[::-1][:3]
-        return [candidates[i] for i in top_idx if sims[i] > 0.25]
-
-    @staticmethod
-    def _build_candidate_bank(fitness_level: str, fitness_goal: str) -> list:
-        return [
-            "Avoid high-impact exercises due to knee pain; substitute with low-impact alternatives.",
-            "Incorporate swimming or cycling for cardiovascular training.",
-            "Focus on upper-body exercises only to protect lower back injury.",
-            "Add yoga and mobility work for flexibility improvement.",
-            "Include daily stretching routine for injury prevention.",
-            "Prefer plant-based protein sources like lentils, tofu, and tempeh.",
-            "Avoid gluten-containing foods; use rice and quinoa as carb bases.",
-            "Incorporate high-fibre vegetables for digestive health.",
-            "Reduce sodium intake; focus on whole, unprocessed foods.",
-            "Include omega-3 rich foods like flaxseed and walnuts.",
-            "Prefer spicy cuisine; incorporate jalapeños and hot sauce.",
-            "Focus on quick-prep meals under 20 minutes.",
-            "Batch-cook on Sundays for the week ahead.",
-            "Include intermittent fasting window (16:8).",
-            "Focus on progressive overload with barbell compound movements.",
-            "Use resistance bands as primary equipment for home workouts.",
-            "Incorporate HIIT sessions three times per week.",
-            "Prioritise recovery; include active rest days with walking.",
-        ]
+        with _inference_mode():
+            if self._cand_embs is None:
+                # Cold start: one padded batch for the queries and the whole bank
+                all_embs = model.encode(
+                    [*free_texts, *self._cand_bank], batch_size=n + len(self._cand_bank),
+                    show_progress_bar=False, convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+                all_embs = np.ascontiguousarray(all_embs, dtype=np.float32)
+                query_embs, self._cand_embs = all_embs[:n], all_embs[n:]
+            else:
+                query_embs = model.encode(
+                    list(free_texts), batch_size=n, show_progress_bar=False,
+                    convert_to_numpy=True, normalize_embeddings=True,
+                )
+
+        matches = _search(np.asarray(query_embs, dtype=np.float32), self._cand_embs)
+        return [[self._cand_bank[i] for i in top_idx] for top_idx in matches]
+
+
+# ─── Process-wide loader ──────────────────────────────────────────────────────
+@st.cache_resource(show_spinner="Loading AI models...")
+def get_model_loader(model_dir: str = ".") -> ModelLoader:
+    """One ModelLoader per model_dir, shared by every session and rerun."""
+    return ModelLoader(model_dir)
+
+
+def export_joblib(model_dir: str = ".") -> list:
+    """
+    Write a .joblib copy next to each model pickle that loads.
+
+    joblib stores numpy arrays uncompressed and page-aligned, so the loader
+    can memory-map them; run this once at deploy time. Returns the paths
+    written.
+    """
+    import joblib
+
+    written = []
+    for filename in ModelLoader.MODEL_FILES.values():
+        path = os.path.join(model_dir, filename)
+        try:
+            obj = _safe_load(path)
+        except Exception as e:
+            logger.warning(f"Skipping {filename}: {e}")
+            continue
+        out_path = os.path.splitext(path)[0] + ".joblib"
+        # obj may be mapped from the current export, so never write over it in place
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, out_path)
+        written.append(out_path)
+    return written
@@ -1,142 +1,181 @@
 """planner.py — Workout and diet plan generation logic."""
 
 from __future__ import annotations
+import json
 import random
+import threading
+from collections import namedtuple
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Exercise Database
 # ─────────────────────────────────────────────────────────────────────────────
 
+Exercise = namedtuple("Exercise", "name sets muscle")
+
+
+@dataclass(slots=True)
+class WorkoutDay:
+    day: str
+    focus: str
+    type: str                 # "workout" or "rest"
+    exercises: list[Exercise]
+    duration_min: int
+    notes: str
+
+
 EXERCISE_DB = {
     "Beginner": {
         "Weight Loss": {
-            "Bodyweight": [
-                {"name": "Jumping Jacks",       "sets": "3×30s",  "muscle": "Full Body"},
-                {"name": "Bodyweight Squats",   "sets": "3×15",   "muscle": "Quads / Glutes"},
-                {"name": "Push-ups (Knee)",      "sets": "3×10",   "muscle": "Chest / Triceps"},
-                {"name": "Mountain Climbers",    "sets": "3×20",   "muscle": "Core / Cardio"},
-                {"name": "Glute Bridges",        "sets": "3×15",   "muscle": "Glutes / Hamstrings"},
-                {"name": "Plank Hold",           "sets": "3×20s",  "muscle": "Core"},
-            ],
-            "Dumbbells": [
-                {"name": "DB Goblet Squat",      "sets": "3×12",   "muscle": "Quads"},
-                {"name": "DB Romanian Deadlift", "sets": "3×12",   "muscle": "Hamstrings"},
-                {"name": "DB Shoulder Press",    "sets": "3×10",   "muscle": "Shoulders"},
-                {"name": "DB Bent-over Row",     "sets": "3×12",   "muscle": "Back"},
-                {"name": "DB Bicep Curl",        "sets": "3×12",   "muscle": "Biceps"},
-                {"name": "DB Tricep Kickback",   "sets": "3×12",   "muscle": "Triceps"},
-            ],
+            "Bodyweight": (
+                Exercise("Jumping Jacks",        "3×30s",   "Full Body"),
+                Exercise("Bodyweight Squats",    "3×15",    "Quads / Glutes"),
+                Exercise("Push-ups (Knee)",      "3×10",    "Chest / Triceps"),
+                Exercise("Mountain Climbers",    "3×20",    "Core / Cardio"),
+                Exercise("Glute Bridges",        "3×15",    "Glutes / Hamstrings"),
+                Exercise("Plank Hold",           "3×20s",   "Core"),
+            ),
+            "Dumbbells": (
+                Exercise("DB Goblet Squat",      "3×12",    "Quads"),
+                Exercise("DB Romanian Deadlift", "3×12",    "Hamstrings"),
+                Exercise("DB Shoulder Press",    "3×10",    "Shoulders"),
+                Exercise("DB Bent-over Row",     "3×12",    "Back"),
+                Exercise("DB Bicep Curl",        "3×12",    "Biceps"),
+                Exercise("DB Tricep Kickback",   "3×12",    "Triceps"),
+            ),
         },
         "Muscle Gain": {
-            "Bodyweight": [
-                {"name": "Push-ups",             "sets": "4×12",   "muscle": "Chest / Triceps"},
-                {"name": "Inverted Rows",        "sets": "4×10",   "muscle": "Back / Biceps"},
-                {"name": "Jump Squats",          "sets": "4×10",   "muscle": "Quads / Glutes"},
-                {"name": "Dips (Chair)",         "sets": "3×10",   "muscle": "Triceps / Chest"},
-                {"name": "Pike Push-ups",        "sets": "3×10",   "muscle": "Shoulders"},
-                {"name": "Plank to Push-up",     "sets": "3×8",    "muscle": "Core / Chest"},
-            ],
-            "Dumbbells": [
-                {"name": "DB Bench Press",       "sets": "4×10",   "muscle": "Chest"},
-                {"name": "DB Deadlift",          "sets": "4×10",   "muscle": "Posterior Chain"},
-                {"name": "DB Squat",             "sets": "4×12",   "muscle": "Quads / Glutes"},
-                {"name": "DB Overhead Press",    "sets": "4×10",   "muscle": "Shoulders"},
-                {"name": "DB Row",               "sets": "4×10",   "muscle": "Back"},
-                {"name": "DB Curl + Press",      "sets": "3×10",   "muscle": "Biceps / Shoulders"},
-            ],
+            "Bodyweight": (
+                Exercise("Push-ups",             "4×12",    "Chest / Triceps"),
+                Exercise("Inverted Rows",        "4×10",    "Back / Biceps"),
+                Exercise("Jump Squats",          "4×10",    "Quads / Glutes"),
+                Exercise("Dips (Chair)",         "3×10",    "Triceps / Chest"),
+                Exercise("Pike Push-ups",        "3×10",    "Shoulders"),
+                Exercise("Plank to Push-up",     "3×8",     "Core / Chest"),
+            ),
+            "Dumbbells": (
+                Exercise("DB Bench Press",       "4×10",    "Chest"),
+                Exercise("DB Deadlift",          "4×10",    "Posterior Chain"),
+                Exercise("DB Squat",             "4×12",    "Quads / Glutes"),
+                Exercise("DB Overhead Press",    "4×10",    "Shoulders"),
+                Exercise("DB Row",               "4×10",    "Back"),
+                Exercise("DB Curl + Press",      "3×10",    "Biceps / Shoulders"),
+            ),
         },
     },
     "Intermediate": {
         "Weight Loss": {
-            "Bodyweight": [
-                {"name": "Burpees",              "sets": "4×10",   "muscle": "Full Body"},
-                {"name": "Box Jumps",            "sets": "4×8",    "muscle": "Legs / Power"},
-                {"name": "Spiderman Push-ups",   "sets": "4×10",   "muscle": "Chest / Core"},
-                {"name": "Bulgarian Split Squat","sets": "3×12",   "muscle": "Quads / Glutes"},
-                {"name": "Bear Crawls",          "sets": "3×20m",  "muscle": "Full Body"},
-                {"name": "V-ups",                "sets": "4×15",   "muscle": "Core"},
-            ],
-            "Barbell": [
-                {"name": "Barbell Squat",        "sets": "4×10",   "muscle": "Quads / Glutes"},
-                {"name": "Deadlift",             "sets": "4×8",    "muscle": "Posterior Chain"},
-                {"name": "Bench Press",          "sets": "4×10",   "muscle": "Chest"},
-                {"name": "Bent-over Row",        "sets": "4×10",   "muscle": "Back"},
-                {"name": "Overhead Press",       "sets": "3×10",   "muscle": "Shoulders"},
-                {"name": "Romanian Deadlift",    "sets": "3×12",   "muscle": "Hamstrings"},
-            ],
+            "Bodyweight": (
+                Exercise("Burpees",              "4×10",    "Full Body"),
+                Exercise("Box Jumps",            "4×8",     "Legs / Power"),
+                Exercise("Spiderman Push-ups",   "4×10",    "Chest / Core"),
+                Exercise("Bulgarian Split Squat","3×12",    "Quads / Glutes"),
+                Exercise("Bear Crawls",          "3×20m",   "Full Body"),
+                Exercise("V-ups",                "4×15",    "Core"),
+            ),
+            "Barbell": (
+                Exercise("Barbell Squat",        "4×10",    "Quads / Glutes"),
+                Exercise("Deadlift",             "4×8",     "Posterior Chain"),
+                Exercise("Bench Press",          "4×10",    "Chest"),
+                Exercise("Bent-over Row",        "4×10",    "Back"),
+                Exercise("Overhead Press",       "3×10",    "Shoulders"),
+                Exercise("Romanian Deadlift",    "3×12",    "Hamstrings"),
+            ),
         },
         "Muscle Gain": {
-            "Barbell": [
-                {"name": "Barbell Squat",        "sets": "5×5",    "muscle": "Quads / Glutes"},
-                {"name": "Bench Press",          "sets": "5×5",    "muscle": "Chest"},
-                {"name": "Deadlift",             "sets": "4×5",    "muscle": "Full Posterior"},
-                {"name": "Barbell Row",          "sets": "4×6",    "muscle": "Back"},
-                {"name": "Overhead Press",       "sets": "4×6",    "muscle": "Shoulders"},
-                {"name": "Barbell Hip Thrust",   "sets": "4×10",   "muscle": "Glutes"},
-            ],
-            "Dumbbells": [
-                {"name": "DB Incline Press",     "sets": "4×10",   "muscle": "Upper Chest"},
-                {"name": "DB Lateral Raise",     "sets": "4×15",   "muscle": "Side Delts"},
-                {"name": "Hammer Curl",          "sets": "3×12",   "muscle": "Biceps / Brachialis"},
-                {"name": "Skull Crushers",       "sets": "3×12",   "muscle": "Triceps"},
-                {"name": "Bulgarian Split Squat","sets": "4×10",   "muscle": "Quads / Glutes"},
-                {"name": "DB Shrugs",            "sets": "3×15",   "muscle": "Traps"},
-            ],
+            "Barbell": (
+                Exercise("Barbell Squat",        "5×5",     "Quads / Glutes"),
+                Exercise("Bench Press",          "5×5",     "Chest"),
+                Exercise("Deadlift",             "4×5",     "Full Posterior"),
+                Exercise("Barbell Row",          "4×6",     "Back"),
+                Exercise("Overhead Press",       "4×6",     "Shoulders"),
+                Exercise("Barbell Hip Thrust",   "4×10",    "Glutes"),
+            ),
+            "Dumbbells": (
+                Exercise("DB Incline Press",     "4×10",    "Upper Chest"),
+                Exercise("DB Lateral Raise",     "4×15",    "Side Delts"),
+                Exercise("Hammer Curl",          "3×12",    "Biceps / Brachialis"),
+                Exercise("Skull Crushers",       "3×12",    "Triceps"),
+                Exercise("Bulgarian Split Squat","4×10",    "Quads / Glutes"),
+                Exercise("DB Shrugs",            "3×15",    "Traps"),
+            ),
         },
     },
     "Advanced": {
         "Muscle Gain": {
-            "Barbell": [
-                {"name": "Squat (Heavy)",        "sets": "6×4",    "muscle": "Quads / Glutes"},
-                {"name": "Deadlift (Heavy)",     "sets": "5×3",    "muscle": "Full Posterior"},
-                {"name": "Bench Press (Heavy)",  "sets": "5×4",    "muscle": "Chest"},
-                {"name": "Weighted Pull-ups",    "sets": "5×5",    "muscle": "Back / Biceps"},
-                {"name": "Push Press",           "sets": "4×5",    "muscle": "Shoulders / Triceps"},
-                {"name": "Barbell Lunge",        "sets": "4×8/leg","muscle": "Quads / Glutes"},
-            ],
-            "Bodyweight": [
-                {"name": "Muscle-ups",           "sets": "4×5",    "muscle": "Full Upper Body"},
-                {"name": "Pistol Squats",        "sets": "4×6/leg","muscle": "Quads / Balance"},
-                {"name": "Handstand Push-ups",   "sets": "3×6",    "muscle": "Shoulders / Triceps"},
-                {"name": "Dragon Flags",         "sets": "3×6",    "muscle": "Core"},
-                {"name": "One-arm Row",          "sets": "4×8",    "muscle": "Back"},
-                {"name": "Plyometric Push-ups",  "sets": "4×10",   "muscle": "Chest / Power"},
-            ],
+            "Barbell": (
+                Exercise("Squat (Heavy)",        "6×4",     "Quads / Glutes"),
+                Exercise("Deadlift (Heavy)",     "5×3",     "Full Posterior"),
+                Exercise("Bench Press (Heavy)",  "5×4",     "Chest"),
+                Exercise("Weighted Pull-ups",    "5×5",     "Back / Biceps"),
+                Exercise("Push Press",           "4×5",     "Shoulders / Triceps"),
+                Exercise("Barbell Lunge",        "4×8/leg", "Quads / Glutes"),
+            ),
+            "Bodyweight": (
+                Exercise("Muscle-ups",           "4×5",     "Full Upper Body"),
+                Exercise("Pistol Squats",        "4×6/leg", "Quads / Balance"),
+                Exercise("Handstand Push-ups",   "3×6",     "Shoulders / Triceps"),
+                Exercise("Dragon Flags",         "3×6",     "Core"),
+                Exercise("One-arm Row",          "4×8",     "Back"),
+                Exercise("Plyometric Push-ups",  "4×10",    "Chest / Power"),
+            ),
         },
         "Endurance": {
-            "Bodyweight": [
-                {"name": "EMOM Burpees (10min)", "sets": "1×10min","muscle": "Full Body"},
-                {"name": "Double Unders",        "sets": "5×50",   "muscle": "Cardio / Calves"},
-                {"name": "Air Squats Tabata",    "sets": "8×20s",  "muscle": "Legs"},
-                {"name": "Pull-ups AMRAP",       "sets": "4×max",  "muscle": "Back / Biceps"},
-                {"name": "Push-up AMRAP",        "sets": "4×max",  "muscle": "Chest / Triceps"},
-                {"name": "L-sit Hold",           "sets": "4×15s",  "muscle": "Core"},
-            ],
+            "Bodyweight": (
+                Exercise("EMOM Burpees (10min)", "1×10min", "Full Body"),
+                Exercise("Double Unders",        "5×50",    "Cardio / Calves"),
+                Exercise("Air Squats Tabata",    "8×20s",   "Legs"),
+                Exercise("Pull-ups AMRAP",       "4×max",   "Back / Biceps"),
+                Exercise("Push-up AMRAP",        "4×max",   "Chest / Triceps"),
+                Exercise("L-sit Hold",           "4×15s",   "Core"),
+            ),
         },
     },
     "Elite": {
         "Muscle Gain": {
-            "Barbell": [
-                {"name": "Competition Squat",    "sets": "7×3",    "muscle": "Quads / Glutes"},
-                {"name": "Sumo Deadlift",        "sets": "6×2",    "muscle": "Full Posterior"},
-                {"name": "Close-grip Bench",     "sets": "5×4",    "muscle": "Chest / Triceps"},
-                {"name": "Pendlay Row",          "sets": "5×5",    "muscle": "Back"},
-                {"name": "Z-press",              "sets": "4×6",    "muscle": "Shoulders"},
-                {"name": "Pause Squat",          "sets": "4×5",    "muscle": "Quads / Core"},
-            ],
-            "Bodyweight": [
-                {"name": "Ring Muscle-ups",      "sets": "5×5",    "muscle": "Full Upper Body"},
-                {"name": "Planche Hold",         "sets": "5×5s",   "muscle": "Chest / Core"},
-                {"name": "Front Lever Row",      "sets": "4×5",    "muscle": "Back"},
-                {"name": "HSPUs (Strict)",       "sets": "5×5",    "muscle": "Shoulders"},
-                {"name": "Pistol Squat Depth",   "sets": "4×8/leg","muscle": "Quads"},
-                {"name": "Dragon Flag",          "sets": "4×8",    "muscle": "Core"},
-            ],
+            "Barbell": (
+                Exercise("Competition Squat",    "7×3",     "Quads / Glutes"),
+                Exercise("Sumo Deadlift",        "6×2",     "Full Posterior"),
+                Exercise("Close-grip Bench",     "5×4",     "Chest / Triceps"),
+                Exercise("Pendlay Row",          "5×5",     "Back"),
+                Exercise("Z-press",              "4×6",     "Shoulders"),
+                Exercise("Pause Squat",          "4×5",     "Quads / Core"),
+            ),
+            "Bodyweight": (
+                Exercise("Ring Muscle-ups",      "5×5",     "Full Upper Body"),
+                Exercise("Planche Hold",         "5×5s",    "Chest / Core"),
+                Exercise("Front Lever Row",      "4×5",     "Back"),
+                Exercise("HSPUs (Strict)",       "5×5",     "Shoulders"),
+                Exercise("Pistol Squat Depth",   "4×8/leg", "Quads"),
+                Exercise("Dragon Flag",          "4×8",     "Core"),
+            ),
         },
     },
 }
 
+# EXERCISE_DB flattened once at import: (level, goal, equipment) -> exercises,
+# plus the first-listed equipment tier per (level, goal) and goal per level
+_EX_FLAT = {
+    (lvl, goal, eq): exercises
+    for lvl, goals in EXERCISE_DB.items()
+    for goal, tiers in goals.items()
+    for eq, exercises in tiers.items()
+}
+_EX_FALLBACK = {
+    (lvl, goal): next(iter(tiers.values()))
+    for lvl, goals in EXERCISE_DB.items()
+    for goal, tiers in goals.items()
+}
+_EX_DEFAULT_GOAL = {lvl: next(iter(goals)) for lvl, goals in EXERCISE_DB.items()}
+
 WEEKLY_STRUCTURE = {
     "Weight Loss":  ["Full Body HIIT", "Rest / Walk", "Upper Body", "Cardio", "Lower Body", "Full Body", "Rest"],
     "Muscle Gain":  ["Push",           "Pull",        "Legs",       "Rest",   "Push",        "Pull",      "Legs"],
@@ -145,6 +184,22 @@ WEEKLY_STRUCTURE = {
     "Maintenance":  ["Full Body",      "Rest",        "Full Body",  "Cardio", "Full Body",   "Cardio",    "Rest"],
 }
 
+# Weekly burn = MET × kg × session hours × sessions; all but kg precomputed
+_SESSIONS_PER_WEEK = {"Beginner": 4, "Intermediate": 5, "Advanced": 6, "Elite": 6}
+_WORKOUT_METS      = {"Weight Loss": 7.0, "Muscle Gain": 5.5, "Endurance": 8.5,
+                      "General Fitness": 6.0, "Maintenance": 5.0}
+_SESSION_HOURS     = 0.75
+_CAL_COEFF = {
+    (lvl, goal): met * _SESSION_HOURS * sessions
+    for lvl, sessions in _SESSIONS_PER_WEEK.items()
+    for goal, met in _WORKOUT_METS.items()
+}
+
+# Every focus in WEEKLY_STRUCTURE that schedules a rest day ("Rest", "Rest / Walk")
+_REST_FOCUSES = frozenset(
+    focus for week in WEEKLY_STRUCTURE.values() for focus in week if "Rest" in focus
+)
+
 DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 
@@ -155,225 +210,307 @@ class WorkoutPlanner:
         fitness_goal: str,
         available_equipment: list[str],
         notes: list[str],
-    ) -> list[dict]:
+    ) -> list[WorkoutDay]:
         """Return a 7-day workout plan."""
-        structure = WEEKLY_STRUCTURE.get(fitness_goal, WEEKLY_STRUCTURE["General Fitness"])
-
-        # Find best exercise set
-        level_db = EXERCISE_DB.get(fitness_level, EXERCISE_DB["Intermediate"])
-        goal_db  = level_db.get(fitness_goal, next(iter(level_db.values())))
-
-        # Pick equipment tier
-        equip_order = _rank_equipment(available_equipment)
-        exercises = goal_db.get(equip_order[0], next(iter(goal_db.values())))
-
-        plan = []
-        for i, (day, focus) in enumerate(zip(DAYS, structure)):
-            if "Rest" in focus:
-                plan.append({
-                    "day": day, "focus": focus, "type": "rest",
-                    "exercises": [],
-                    "duration_min": 0, "notes": "Active recovery: light walking or stretching",
-                })
+        return list(WorkoutPlanner.generate_iter(
+            fitness_level, fitness_goal, available_equipment, notes
+        ))
+
+    @staticmethod
+    def generate_iter(
+        fitness_level: str,
+        fitness_goal: str,
+        available_equipment: list[str],
+        notes: list[str],
+    ) -> Iterator[WorkoutDay]:
+        """Yield the 7-day workout plan one day at a time."""
+        top_equipment = _rank_equipment(available_equipment)[0]
+        skeleton = _SKELETONS.get((fitness_level, fitness_goal, top_equipment))
+        if skeleton is None:
+            skeleton = _workout_skeleton(fitness_level, fitness_goal, top_equipment)
+
+        # The skeleton is shared; build fresh dicts and splice in the notes
+        note_suffix = f" ★ {notes[0]}" if notes else ""
+        for day, focus, kind, exercises, duration in skeleton:
+            if kind == "rest":
+                note = "Active recovery: light walking or stretching"
             else:
-                # Pick 4-6 exercises with slight variation per day
-                rng = random.Random(i + hash(fitness_level))
-                shuffled = exercises.copy()
-                rng.shuffle(shuffled)
-                n = min(6, max(4, len(shuffled)))
-                plan.append({
-                    "day": day, "focus": focus, "type": "workout",
-                    "exercises": shuffled[:n],
-                    "duration_min": 45 if fitness_level in ("Beginner", "Intermediate") else 60,
-                    "notes": _workout_note(focus, fitness_goal, notes),
-                })
-        return plan
+                note = _workout_note(focus, note_suffix)
+            yield WorkoutDay(day, focus, kind, list(exercises), duration, note)
 
     @staticmethod
     def estimate_weekly_calorie_burn(
         fitness_level: str, fitness_goal: str, weight_kg: float
     ) -> float:
         """Rough weekly calorie burn from workouts."""
-        sessions = {"Beginner": 4, "Intermediate": 5, "Advanced": 6, "Elite": 6}.get(fitness_level, 5)
-        met      = {"Weight Loss": 7.0, "Muscle Gain": 5.5, "Endurance": 8.5,
-                    "General Fitness": 6.0, "Maintenance": 5.0}.get(fitness_goal, 6.0)
-        duration_h = 0.75
-        return round(met * weight_kg * duration_h * sessions, 0)
+        coeff = _CAL_COEFF.get((fitness_level, fitness_goal))
+        if coeff is None:
+            coeff = (_WORKOUT_METS.get(fitness_goal, 6.0) * _SESSION_HOURS
+                     * _SESSIONS_PER_WEEK.get(fitness_level, 5))
+        return round(coeff * weight_kg, 0)
+
+
+@lru_cache(maxsize=128)
+def _workout_skeleton(
+    fitness_level: str, fitness_goal: str, top_equipment: str
+) -> tuple[tuple, ...]:
+    """(day, focus, type, exercises, duration_min) per day; notes are added by the caller."""
+    structure = WEEKLY_STRUCTURE.get(fitness_goal, WEEKLY_STRUCTURE["General Fitness"])
+
+    # Find best exercise set
+    level = fitness_level if fitness_level in EXERCISE_DB else "Intermediate"
+    goal  = fitness_goal if (level, fitness_goal) in _EX_FALLBACK else _EX_DEFAULT_GOAL[level]
+    exercises = _EX_FLAT.get((level, goal, top_equipment))
+    if exercises is None:
+        exercises = _EX_FALLBACK[(level, goal)]
+    n = min(6, len(exercises))   # 4-6 per day, or all of a shorter list
+    level_hash = hash(fitness_level)
+    duration = 45 if fitness_level in ("Beginner", "Intermediate") else 60
+
+    days = []
+    rng = _thread_rng()
+    for i, (day, focus) in enumerate(zip(DAYS, structure)):
+        if focus in _REST_FOCUSES:
+            days.append((day, focus, "rest", (), 0))
+        else:
+            # Pick n exercises with slight variation per day
+            rng.seed(i + level_hash)   # same stream as Random(i + level_hash)
+            days.append((day, focus, "workout", tuple(rng.sample(exercises, n)), duration))
+    return tuple(days)
+
+
+_rng_local = threading.local()
+
+
+def _thread_rng() -> random.Random:
+    """This thread's reusable generator; callers reseed it before every draw."""
+    rng = getattr(_rng_local, "rng", None)
+    if rng is None:
+        rng = _rng_local.rng = random.Random()
+    return rng
+
+
+_EQUIPMENT_PRIORITY = ("Barbell", "Dumbbells", "Resistance Bands", "Bodyweight", "Machines")
 
 
 def _rank_equipment(equipment: list[str]) -> list[str]:
     """Prefer barbell > dumbbells > resistance bands > bodyweight."""
-    priority = ["Barbell", "Dumbbells", "Resistance Bands", "Bodyweight", "Machines"]
     owned = set(equipment)
-    return [e for e in priority if e in owned] + [e for e in priority if e not in owned]
-
-
-def _workout_note(focus: str, goal: str, nlp_notes: list[str]) -> str:
-    base_notes = {
-        "Full Body HIIT": "Keep rest < 30s; heart rate 75-85% max.",
-        "Upper Body":     "Focus on mind-muscle connection; controlled negatives.",
-        "Lower Body":     "Drive through heels; full depth on squats.",
-        "Push":           "Progressive overload: add 2.5kg when you hit top of rep range.",
-        "Pull":           "Control the eccentric; aim for full shoulder extension.",
-        "Legs":           "Warm up thoroughly; prioritise form over load.",
-        "Cardio":         "Maintain conversational pace for aerobic base.",
-        "Strength":       "Rest 2-3 min between heavy sets.",
-        "Full Body":      "Compound-first ordering; save isolation for the end.",
-        "Long Cardio":    "Zone 2 intensity: 60-70% max HR for 45-90 min.",
-    }
-    note = base_notes.get(focus, "Focus on quality reps over speed.")
-    if nlp_notes:
-        note += f" ★ {nlp_notes[0]}"
-    return note
+    # Stable sort: owned items first, each group still in priority order
+    return sorted(_EQUIPMENT_PRIORITY, key=lambda e: e not in owned)
+
+
+# Skeletons for every known (level, goal, top equipment) built once at import;
+# only unrecognised inputs reach _workout_skeleton's cache
+_SKELETONS = {
+    (lvl, goal, eq): _workout_skeleton(lvl, goal, eq)
+    for lvl in EXERCISE_DB
+    for goal in WEEKLY_STRUCTURE
+    for eq in _EQUIPMENT_PRIORITY
+}
+_workout_skeleton.cache_clear()
+
+
+_BASE_NOTES = {
+    "Full Body HIIT": "Keep rest < 30s; heart rate 75-85% max.",
+    "Upper Body":     "Focus on mind-muscle connection; controlled negatives.",
+    "Lower Body":     "Drive through heels; full depth on squats.",
+    "Push":           "Progressive overload: add 2.5kg when you hit top of rep range.",
+    "Pull":           "Control the eccentric; aim for full shoulder extension.",
+    "Legs":           "Warm up thoroughly; prioritise form over load.",
+    "Cardio":         "Maintain conversational pace for aerobic base.",
+    "Strength":       "Rest 2-3 min between heavy sets.",
+    "Full Body":      "Compound-first ordering; save isolation for the end.",
+    "Long Cardio":    "Zone 2 intensity: 60-70% max HR for 45-90 min.",
+}
+
+
+def _workout_note(focus: str, note_suffix: str) -> str:
+    return _BASE_NOTES.get(focus, "Focus on quality reps over speed.") + note_suffix
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Diet Planner
 # ─────────────────────────────────────────────────────────────────────────────
 
+FoodItem = namedtuple("FoodItem", "item protein carbs fat cost")
+
+
+@dataclass(slots=True)
+class Meal:
+    name: str
+    item: str
+    calories: int
+    protein: int
+    carbs: int
+    fat: int
+    cost: float
+
+
+@dataclass(slots=True)
+class DietDay:
+    day: str
+    meals: list[Meal]
+
+
+@dataclass(slots=True)
+class DietPlan:
+    weekly_plan: list[DietDay]
+    daily_template: list[Meal]
+    total_daily_cal: float
+    macros: dict
+    budget_usd: float
+    dietary_preference: str
+    cultural_food_habits: str
+    nlp_adjustment: str | None
+    daily_costs: tuple[float, ...]     # summed meal cost per weekly_plan day
+
+
 FOOD_DB = {
     "Vegetarian": {
         "South Asian": {
-            "breakfast": [
-                {"item": "Masala Oats with milk", "protein": 12, "carbs": 45, "fat": 8, "cost": 0.80},
-                {"item": "Idli (3) + Sambar + Chutney", "protein": 10, "carbs": 55, "fat": 4, "cost": 0.60},
-                {"item": "Poha with peanuts + boiled egg",  "protein": 14, "carbs": 48, "fat": 7, "cost": 0.70},
-            ],
-            "lunch": [
-                {"item": "Brown rice + Dal + Mixed veg sabzi + Raita", "protein": 18, "carbs": 70, "fat": 6, "cost": 1.20},
-                {"item": "Roti (3) + Paneer curry + Salad", "protein": 22, "carbs": 55, "fat": 14, "cost": 1.50},
-                {"item": "Rajma rice + Curd", "protein": 20, "carbs": 72, "fat": 5, "cost": 1.10},
-            ],
-            "snack": [
-                {"item": "Greek yogurt + banana", "protein": 14, "carbs": 30, "fat": 2, "cost": 0.50},
-                {"item": "Roasted chana + sprouts", "protein": 12, "carbs": 22, "fat": 3, "cost": 0.40},
-                {"item": "Paneer cubes + cucumber", "protein": 16, "carbs": 5, "fat": 10, "cost": 0.70},
-            ],
-            "dinner": [
-                {"item": "Chapati (2) + Palak tofu + Dal soup", "protein": 24, "carbs": 55, "fat": 8, "cost": 1.30},
-                {"item": "Khichdi (rice + moong) + Ghee + Papad", "protein": 16, "carbs": 65, "fat": 7, "cost": 0.90},
-                {"item": "Paneer tikka + roti (2) + salad", "protein": 28, "carbs": 48, "fat": 12, "cost": 1.80},
-            ],
+            "breakfast": (
+                FoodItem("Masala Oats with milk", 12, 45, 8, 0.80),
+                FoodItem("Idli (3) + Sambar + Chutney", 10, 55, 4, 0.60),
+                FoodItem("Poha with peanuts + boiled egg", 14, 48, 7, 0.70),
+            ),
+            "lunch": (
+                FoodItem("Brown rice + Dal + Mixed veg sabzi + Raita", 18, 70, 6, 1.20),
+                FoodItem("Roti (3) + Paneer curry + Salad", 22, 55, 14, 1.50),
+                FoodItem("Rajma rice + Curd", 20, 72, 5, 1.10),
+            ),
+            "snack": (
+                FoodItem("Greek yogurt + banana", 14, 30, 2, 0.50),
+                FoodItem("Roasted chana + sprouts", 12, 22, 3, 0.40),
+                FoodItem("Paneer cubes + cucumber", 16, 5, 10, 0.70),
+            ),
+            "dinner": (
+                FoodItem("Chapati (2) + Palak tofu + Dal soup", 24, 55, 8, 1.30),
+                FoodItem("Khichdi (rice + moong) + Ghee + Papad", 16, 65, 7, 0.90),
+                FoodItem("Paneer tikka + roti (2) + salad", 28, 48, 12, 1.80),
+            ),
         },
         "Western": {
-            "breakfast": [
-                {"item": "Overnight oats + chia + berries", "protein": 12, "carbs": 55, "fat": 8, "cost": 1.20},
-                {"item": "Whole-grain toast + avocado + poached eggs", "protein": 18, "carbs": 38, "fat": 16, "cost": 2.00},
-                {"item": "Smoothie bowl (banana, protein powder, granola)", "protein": 22, "carbs": 60, "fat": 5, "cost": 1.80},
-            ],
-            "lunch": [
-                {"item": "Quinoa salad + chickpeas + feta + olive oil", "protein": 18, "carbs": 52, "fat": 12, "cost": 2.50},
-                {"item": "Lentil soup + whole-grain bread", "protein": 16, "carbs": 55, "fat": 5, "cost": 1.50},
-                {"item": "Buddha bowl (brown rice, roasted veg, tahini)", "protein": 14, "carbs": 65, "fat": 10, "cost": 2.20},
-            ],
-            "snack": [
-                {"item": "Apple + almond butter", "protein": 5, "carbs": 28, "fat": 8, "cost": 0.80},
-                {"item": "Cottage cheese + pineapple", "protein": 18, "carbs": 18, "fat": 2, "cost": 1.00},
-                {"item": "Hummus + carrot sticks", "protein": 7, "carbs": 20, "fat": 6, "cost": 0.70},
-            ],
-            "dinner": [
-                {"item": "Stuffed bell peppers (quinoa, black beans, cheese)", "protein": 22, "carbs": 55, "fat": 10, "cost": 2.80},
-                {"item": "Pasta primavera + parmesan", "protein": 18, "carbs": 68, "fat": 9, "cost": 2.00},
-                {"item": "Veggie stir-fry with tofu + brown rice", "protein": 24, "carbs": 62, "fat": 8, "cost": 1.80},
-            ],
+            "breakfast": (
+                FoodItem("Overnight oats + chia + berries", 12, 55, 8, 1.20),
+                FoodItem("Whole-grain toast + avocado + poached eggs", 18, 38, 16, 2.00),
+                FoodItem("Smoothie bowl (banana, protein powder, granola)", 22, 60, 5, 1.80),
+            ),
+            "lunch": (
+                FoodItem("Quinoa salad + chickpeas + feta + olive oil", 18, 52, 12, 2.50),
+                FoodItem("Lentil soup + whole-grain bread", 16, 55, 5, 1.50),
+                FoodItem("Buddha bowl (brown rice, roasted veg, tahini)", 14, 65, 10, 2.20),
+            ),
+            "snack": (
+                FoodItem("Apple + almond butter", 5, 28, 8, 0.80),
+                FoodItem("Cottage cheese + pineapple", 18, 18, 2, 1.00),
+                FoodItem("Hummus + carrot sticks", 7, 20, 6, 0.70),
+            ),
+            "dinner": (
+                FoodItem("Stuffed bell peppers (quinoa, black beans, cheese)", 22, 55, 10, 2.80),
+                FoodItem("Pasta primavera + parmesan", 18, 68, 9, 2.00),
+                FoodItem("Veggie stir-fry with tofu + brown rice", 24, 62, 8, 1.80),
+            ),
         },
     },
     "Non-Vegetarian": {
         "South Asian": {
-            "breakfast": [
-                {"item": "Egg omelette (3 eggs) + toast + milk", "protein": 24, "carbs": 35, "fat": 14, "cost": 0.90},
-                {"item": "Chicken poha + boiled egg", "protein": 22, "carbs": 50, "fat": 8, "cost": 1.00},
-                {"item": "Oats + whey protein + banana", "protein": 28, "carbs": 55, "fat": 5, "cost": 1.20},
-            ],
-            "lunch": [
-                {"item": "Chicken biryani (200g chicken) + raita", "protein": 35, "carbs": 75, "fat": 12, "cost": 1.80},
-                {"item": "Fish curry + brown rice + salad", "protein": 32, "carbs": 68, "fat": 10, "cost": 1.50},
-                {"item": "Egg curry (3 eggs) + roti (3) + dal", "protein": 30, "carbs": 60, "fat": 14, "cost": 1.20},
-            ],
-            "snack": [
-                {"item": "Boiled eggs (2) + chaat masala", "protein": 14, "carbs": 2, "fat": 10, "cost": 0.40},
-                {"item": "Tuna salad on whole-grain crackers", "protein": 20, "carbs": 18, "fat": 4, "cost": 1.10},
-                {"item": "Greek yogurt + protein powder", "protein": 24, "carbs": 18, "fat": 2, "cost": 0.80},
-            ],
-            "dinner": [
-                {"item": "Grilled chicken (200g) + quinoa + steamed broccoli", "protein": 42, "carbs": 45, "fat": 8, "cost": 2.50},
-                {"item": "Prawn stir-fry + roti (2) + dal soup", "protein": 35, "carbs": 55, "fat": 9, "cost": 2.20},
-                {"item": "Mutton keema (150g) + roti (2) + salad", "protein": 38, "carbs": 48, "fat": 16, "cost": 2.80},
-            ],
+            "breakfast": (
+                FoodItem("Egg omelette (3 eggs) + toast + milk", 24, 35, 14, 0.90),
+                FoodItem("Chicken poha + boiled egg", 22, 50, 8, 1.00),
+                FoodItem("Oats + whey protein + banana", 28, 55, 5, 1.20),
+            ),
+            "lunch": (
+                FoodItem("Chicken biryani (200g chicken) + raita", 35, 75, 12, 1.80),
+                FoodItem("Fish curry + brown rice + salad", 32, 68, 10, 1.50),
+                FoodItem("Egg curry (3 eggs) + roti (3) + dal", 30, 60, 14, 1.20),
+            ),
+            "snack": (
+                FoodItem("Boiled eggs (2) + chaat masala", 14, 2, 10, 0.40),
+                FoodItem("Tuna salad on whole-grain crackers", 20, 18, 4, 1.10),
+                FoodItem("Greek yogurt + protein powder", 24, 18, 2, 0.80),
+            ),
+            "dinner": (
+                FoodItem("Grilled chicken (200g) + quinoa + steamed broccoli", 42, 45, 8, 2.50),
+                FoodItem("Prawn stir-fry + roti (2) + dal soup", 35, 55, 9, 2.20),
+                FoodItem("Mutton keema (150g) + roti (2) + salad", 38, 48, 16, 2.80),
+            ),
         },
         "Western": {
-            "breakfast": [
-                {"item": "Scrambled eggs (4) + turkey bacon + sourdough", "protein": 32, "carbs": 40, "fat": 18, "cost": 2.50},
-                {"item": "Greek yogurt parfait + granola + chicken sausage", "protein": 28, "carbs": 52, "fat": 12, "cost": 2.20},
-                {"item": "Protein pancakes + maple syrup + bacon", "protein": 30, "carbs": 58, "fat": 14, "cost": 2.80},
-            ],
-            "lunch": [
-                {"item": "Grilled chicken salad + vinaigrette + whole-grain roll", "protein": 38, "carbs": 42, "fat": 10, "cost": 3.50},
-                {"item": "Tuna wrap + Greek salad", "protein": 32, "carbs": 48, "fat": 8, "cost": 2.50},
-                {"item": "Salmon bowl + quinoa + avocado", "protein": 36, "carbs": 52, "fat": 16, "cost": 4.00},
-            ],
-            "snack": [
-                {"item": "Cottage cheese + almonds", "protein": 22, "carbs": 10, "fat": 12, "cost": 1.20},
-                {"item": "Turkey slices + celery + hummus", "protein": 20, "carbs": 12, "fat": 5, "cost": 1.50},
-                {"item": "Whey protein shake + banana", "protein": 28, "carbs": 32, "fat": 2, "cost": 1.00},
-            ],
-            "dinner": [
-                {"item": "Grilled salmon (200g) + sweet potato + asparagus", "protein": 42, "carbs": 45, "fat": 14, "cost": 5.00},
-                {"item": "Beef stir-fry + brown rice + bok choy", "protein": 38, "carbs": 58, "fat": 12, "cost": 4.50},
-                {"item": "Baked chicken thighs + roasted veg + couscous", "protein": 40, "carbs": 52, "fat": 10, "cost": 3.50},
-            ],
+            "breakfast": (
+                FoodItem("Scrambled eggs (4) + turkey bacon + sourdough", 32, 40, 18, 2.50),
+                FoodItem("Greek yogurt parfait + granola + chicken sausage", 28, 52, 12, 2.20),
+                FoodItem("Protein pancakes + maple syrup + bacon", 30, 58, 14, 2.80),
+            ),
+            "lunch": (
+                FoodItem("Grilled chicken salad + vinaigrette + whole-grain roll", 38, 42, 10, 3.50),
+                FoodItem("Tuna wrap + Greek salad", 32, 48, 8, 2.50),
+                FoodItem("Salmon bowl + quinoa + avocado", 36, 52, 16, 4.00),
+            ),
+            "snack": (
+                FoodItem("Cottage cheese + almonds", 22, 10, 12, 1.20),
+                FoodItem("Turkey slices + celery + hummus", 20, 12, 5, 1.50),
+                FoodItem("Whey protein shake + banana", 28, 32, 2, 1.00),
+            ),
+            "dinner": (
+                FoodItem("Grilled salmon (200g) + sweet potato + asparagus", 42, 45, 14, 5.00),
+                FoodItem("Beef stir-fry + brown rice + bok choy", 38, 58, 12, 4.50),
+                FoodItem("Baked chicken thighs + roasted veg + couscous", 40, 52, 10, 3.50),
+            ),
         },
     },
     "Vegan": {
         "South Asian": {
-            "breakfast": [
-                {"item": "Tofu scramble + roti (2) + coconut milk chai", "protein": 18, "carbs": 45, "fat": 10, "cost": 0.90},
-                {"item": "Moong dosa + coconut chutney + sambar", "protein": 14, "carbs": 55, "fat": 6, "cost": 0.80},
-                {"item": "Oats porridge with almond milk + chia seeds", "protein": 10, "carbs": 52, "fat": 8, "cost": 1.00},
-            ],
-            "lunch": [
-                {"item": "Rajma (kidney bean) curry + brown rice + salad", "protein": 18, "carbs": 72, "fat": 4, "cost": 1.00},
-                {"item": "Chana masala + roti (3) + onion salad", "protein": 20, "carbs": 65, "fat": 5, "cost": 0.90},
-                {"item": "Mixed dal + millet roti + sabzi", "protein": 16, "carbs": 60, "fat": 5, "cost": 0.80},
-            ],
-            "snack": [
-                {"item": "Roasted makhana + green tea", "protein": 5, "carbs": 20, "fat": 2, "cost": 0.40},
-                {"item": "Banana + peanut butter", "protein": 8, "carbs": 35, "fat": 10, "cost": 0.50},
-                {"item": "Sprout chaat", "protein": 12, "carbs": 25, "fat": 2, "cost": 0.40},
-            ],
-            "dinner": [
-                {"item": "Tofu palak + roti (2) + dal soup", "protein": 22, "carbs": 50, "fat": 8, "cost": 1.20},
-                {"item": "Lentil kitchari + coconut raita", "protein": 18, "carbs": 62, "fat": 7, "cost": 0.80},
-                {"item": "Chickpea tikka + roti (2) + salad", "protein": 20, "carbs": 55, "fat": 6, "cost": 1.00},
-            ],
+            "breakfast": (
+                FoodItem("Tofu scramble + roti (2) + coconut milk chai", 18, 45, 10, 0.90),
+                FoodItem("Moong dosa + coconut chutney + sambar", 14, 55, 6, 0.80),
+                FoodItem("Oats porridge with almond milk + chia seeds", 10, 52, 8, 1.00),
+            ),
+            "lunch": (
+                FoodItem("Rajma (kidney bean) curry + brown rice + salad", 18, 72, 4, 1.00),
+                FoodItem("Chana masala + roti (3) + onion salad", 20, 65, 5, 0.90),
+                FoodItem("Mixed dal + millet roti + sabzi", 16, 60, 5, 0.80),
+            ),
+            "snack": (
+                FoodItem("Roasted makhana + green tea", 5, 20, 2, 0.40),
+                FoodItem("Banana + peanut butter", 8, 35, 10, 0.50),
+                FoodItem("Sprout chaat", 12, 25, 2, 0.40),
+            ),
+            "dinner": (
+                FoodItem("Tofu palak + roti (2) + dal soup", 22, 50, 8, 1.20),
+                FoodItem("Lentil kitchari + coconut raita", 18, 62, 7, 0.80),
+                FoodItem("Chickpea tikka + roti (2) + salad", 20, 55, 6, 1.00),
+            ),
         },
         "Western": {
-            "breakfast": [
-                {"item": "Açaí bowl + granola + mixed berries + hemp seeds", "protein": 10, "carbs": 65, "fat": 8, "cost": 3.50},
-                {"item": "Overnight oats (oat milk) + flaxseed + walnuts", "protein": 12, "carbs": 58, "fat": 12, "cost": 1.80},
-                {"item": "Tofu scramble + avocado + sourdough (2 slices)", "protein": 18, "carbs": 45, "fat": 14, "cost": 2.50},
-            ],
-            "lunch": [
-                {"item": "Lentil & roasted vegetable bowl + tahini", "protein": 18, "carbs": 62, "fat": 10, "cost": 2.50},
-                {"item": "Black bean tacos (3) + guacamole + salsa", "protein": 16, "carbs": 70, "fat": 12, "cost": 2.80},
-                {"item": "Chickpea pasta + marinara + nutritional yeast", "protein": 20, "carbs": 72, "fat": 6, "cost": 2.20},
-            ],
-            "snack": [
-                {"item": "Edamame + sea salt", "protein": 16, "carbs": 14, "fat": 5, "cost": 0.80},
-                {"item": "Almond butter + apple slices", "protein": 6, "carbs": 30, "fat": 10, "cost": 1.00},
-                {"item": "Pumpkin seeds + dark chocolate", "protein": 8, "carbs": 20, "fat": 12, "cost": 1.20},
-            ],
-            "dinner": [
-                {"item": "Tempeh stir-fry + brown rice + broccoli", "protein": 26, "carbs": 60, "fat": 8, "cost": 3.00},
-                {"item": "Stuffed portobello + quinoa + roasted tomatoes", "protein": 18, "carbs": 55, "fat": 8, "cost": 3.50},
-                {"item": "Red lentil soup + crusty sourdough + side salad", "protein": 18, "carbs": 65, "fat": 5, "cost": 2.00},
-            ],
+            "breakfast": (
+                FoodItem("Açaí bowl + granola + mixed berries + hemp seeds", 10, 65, 8, 3.50),
+                FoodItem("Overnight oats (oat milk) + flaxseed + walnuts", 12, 58, 12, 1.80),
+                FoodItem("Tofu scramble + avocado + sourdough (2 slices)", 18, 45, 14, 2.50),
+            ),
+            "lunch": (
+                FoodItem("Lentil & roasted vegetable bowl + tahini", 18, 62, 10, 2.50),
+                FoodItem("Black bean tacos (3) + guacamole + salsa", 16, 70, 12, 2.80),
+                FoodItem("Chickpea pasta + marinara + nutritional yeast", 20, 72, 6, 2.20),
+            ),
+            "snack": (
+                FoodItem("Edamame + sea salt", 16, 14, 5, 0.80),
+                FoodItem("Almond butter + apple slices", 6, 30, 10, 1.00),
+                FoodItem("Pumpkin seeds + dark chocolate", 8, 20, 12, 1.20),
+            ),
+            "dinner": (
+                FoodItem("Tempeh stir-fry + brown rice + broccoli", 26, 60, 8, 3.00),
+                FoodItem("Stuffed portobello + quinoa + roasted tomatoes", 18, 55, 8, 3.50),
+                FoodItem("Red lentil soup + crusty sourdough + side salad", 18, 65, 5, 2.00),
+            ),
         },
     },
 }
 
 MEAL_NAMES = ["Breakfast", "Morning Snack", "Lunch", "Afternoon Snack", "Dinner"]
 MEAL_CALORIE_SPLITS = [0.25, 0.10, 0.30, 0.10, 0.25]
+_CAT_BY_INDEX = ("breakfast", "snack", "lunch", "snack", "dinner")   # FOOD_DB key per meal
+_DEFAULT_MEAL_ITEM = FoodItem("Mixed salad", 10, 20, 5, 1.00)      # menu missing a category
 
 
 class DietPlanner:
@@ -385,13 +522,9 @@ class DietPlanner:
         cultural_food_habits: str,
         budget_usd: float,
         notes: list[str],
-    ) -> dict:
+    ) -> DietPlan:
         """Return a structured 7-day diet plan."""
-        # Resolve DB keys
-        diet_key    = _resolve_diet_key(dietary_preference)
-        culture_key = _resolve_culture_key(cultural_food_habits)
-        meal_db     = FOOD_DB.get(diet_key, FOOD_DB["Non-Vegetarian"])
-        culture_db  = meal_db.get(culture_key, next(iter(meal_db.values())))
+        culture_db = _culture_db(dietary_preference, cultural_food_habits)
 
         # Build a daily template
         daily_template = _build_daily_meals(
@@ -399,75 +532,129 @@ class DietPlanner:
         )
 
         # 7-day plan with slight variation
-        weekly_plan = []
-        for day in DAYS:
-            rng = random.Random(hash(day))
-            day_meals = []
-            for i, (meal_name, split, budget_split) in enumerate(
-                zip(MEAL_NAMES, MEAL_CALORIE_SPLITS, [0.15, 0.05, 0.40, 0.05, 0.35])
-            ):
-                cat_map = {
-                    0: "breakfast", 1: "snack", 2: "lunch", 3: "snack", 4: "dinner"
-                }
-                cat   = cat_map[i]
-                items = culture_db.get(cat, [])
-                item  = rng.choice(items) if items else {"item": "Mixed salad", "protein": 10, "carbs": 20, "fat": 5, "cost": 1.00}
-                target_cal = daily_calories * split
-                day_meals.append({
-                    "name":     meal_name,
-                    "item":     item["item"],
-                    "calories": round(target_cal),
-                    "protein":  item["protein"],
-                    "carbs":    item["carbs"],
-                    "fat":      item["fat"],
-                    "cost":     round(item["cost"], 2),
-                })
-            weekly_plan.append({"day": day, "meals": day_meals})
+        weekly_plan = list(_diet_days(culture_db, daily_calories))
 
         nlp_adjustment = notes[1] if len(notes) > 1 else None
+        daily_costs = tuple(sum(m.cost for m in d.meals) for d in weekly_plan)
+
+        return DietPlan(
+            weekly_plan=weekly_plan,
+            daily_template=daily_template,
+            total_daily_cal=daily_calories,
+            macros=macros,
+            budget_usd=budget_usd,
+            dietary_preference=dietary_preference,
+            cultural_food_habits=cultural_food_habits,
+            nlp_adjustment=nlp_adjustment,
+            daily_costs=daily_costs,
+        )
+
+    @staticmethod
+    def generate_iter(
+        daily_calories: float,
+        dietary_preference: str,
+        cultural_food_habits: str,
+    ) -> Iterator[DietDay]:
+        """Yield the weekly meal plan one day at a time."""
+        culture_db = _culture_db(dietary_preference, cultural_food_habits)
+        yield from _diet_days(culture_db, daily_calories)
 
-        return {
-            "weekly_plan":       weekly_plan,
-            "daily_template":    daily_template,
-            "total_daily_cal":   daily_calories,
-            "macros":            macros,
-            "budget_usd":        budget_usd,
-            "dietary_preference":dietary_preference,
-            "cultural_food_habits": cultural_food_habits,
-            "nlp_adjustment":    nlp_adjustment,
-        }
+
+def _diet_days(culture_db: dict, daily_calories: float) -> Iterator[DietDay]:
+    """The seven DietDays for an already-resolved FOOD_DB menu."""
+    # Per-meal calorie targets and menus depend only on the inputs, not the day
+    per_meal_cal = tuple(round(daily_calories * s) for s in MEAL_CALORIE_SPLITS)
+    per_meal_items = tuple(culture_db.get(cat, ()) for cat in _CAT_BY_INDEX)
+    for d, day in enumerate(DAYS):
+        day_meals = []
+        for i, meal_name in enumerate(MEAL_NAMES):
+            # Rotate through each menu across the week; offsetting by the
+            # meal index keeps the two snacks of a day apart
+            items = per_meal_items[i]
+            item  = items[(d + i) % len(items)] if items else _DEFAULT_MEAL_ITEM
+            day_meals.append(_mk_meal(meal_name, item, per_meal_cal[i]))
+        yield DietDay(day, day_meals)
+
+
+def _culture_db(dietary_preference: str, cultural_food_habits: str) -> dict:
+    """FOOD_DB menus for a diet preference and culture label."""
+    diet_key    = _resolve_diet_key(dietary_preference)
+    culture_key = _resolve_culture_key(cultural_food_habits)
+    meal_db     = FOOD_DB.get(diet_key, FOOD_DB["Non-Vegetarian"])
+    return meal_db.get(culture_key, next(iter(meal_db.values())))
+
+
+def _mk_meal(name: str, item: FoodItem, calories: int) -> Meal:
+    return Meal(name, item.item, calories, item.protein, item.carbs, item.fat, round(item.cost, 2))
 
 
 def _build_daily_meals(culture_db, total_cal, splits, budget):
     meals = []
-    cats  = ["breakfast", "snack", "lunch", "snack", "dinner"]
-    for name, split, cat in zip(MEAL_NAMES, splits, cats):
-        items  = culture_db.get(cat, [])
-        item   = items[0] if items else {"item": "Mixed salad", "protein": 10, "carbs": 20, "fat": 5, "cost": 1.00}
-        meals.append({
-            "name":     name,
-            "item":     item["item"],
-            "calories": round(total_cal * split),
-            "protein":  item["protein"],
-            "carbs":    item["carbs"],
-            "fat":      item["fat"],
-        })
+    for name, split, cat in zip(MEAL_NAMES, splits, _CAT_BY_INDEX):
+        items  = culture_db.get(cat, ())
+        item   = items[0] if items else _DEFAULT_MEAL_ITEM
+        meals.append(_mk_meal(name, item, round(total_cal * split)))
     return meals
 
 
+_DIET_KEYS = {
+    "Vegetarian": "Vegetarian",
+    "Vegan":      "Vegan",
+    "Pescatarian":"Non-Vegetarian",
+    "Non-Vegetarian": "Non-Vegetarian",
+    "Keto":       "Non-Vegetarian",
+    "Paleo":      "Non-Vegetarian",
+}
+
+# Substrings of the UI's culture labels that map to the South Asian menus
+_SOUTH_ASIAN_KEYWORDS = ("Indian", "South Asian", "Middle Eastern", "Southeast Asian")
+
+
+@lru_cache(maxsize=None)
 def _resolve_diet_key(pref: str) -> str:
-    mapping = {
-        "Vegetarian": "Vegetarian",
-        "Vegan":      "Vegan",
-        "Pescatarian":"Non-Vegetarian",
-        "Non-Vegetarian": "Non-Vegetarian",
-        "Keto":       "Non-Vegetarian",
-        "Paleo":      "Non-Vegetarian",
-    }
-    return mapping.get(pref, "Non-Vegetarian")
+    return _DIET_KEYS.get(pref, "Non-Vegetarian")
 
 
+@lru_cache(maxsize=None)
 def _resolve_culture_key(culture: str) -> str:
-    if any(k in culture for k in ["Indian", "South Asian", "Middle Eastern", "Southeast Asian"]):
+    if any(k in culture for k in _SOUTH_ASIAN_KEYWORDS):
         return "South Asian"
     return "Western"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Serialisation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _dataclass_default(obj):
+    """JSON fallback for the plan records (slotted dataclasses have no __dict__)."""
+    if hasattr(obj, "__dataclass_fields__"):
+        return {name: getattr(obj, name) for name in obj.__dataclass_fields__}
+    if hasattr(obj, "_asdict"):
+        return obj._asdict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _plain(obj):
+    """Plan records, namedtuples and containers as plain dicts and lists."""
+    if hasattr(obj, "__dataclass_fields__") or hasattr(obj, "_asdict"):
+        obj = _dataclass_default(obj)
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    return obj
+
+
+def to_json(plan, indent: bool = False) -> bytes:
+    """UTF-8 JSON for a plan or any structure of plan records; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(
+            plan, default=_dataclass_default,
+            option=orjson.OPT_INDENT_2 if indent else 0,
+        )
+    # The json module writes namedtuples as arrays without consulting default,
+    # so convert them up front to match orjson's output
+    return json.dumps(
+        _plain(plan), indent=2 if indent else None, ensure_ascii=False,
+    ).encode()
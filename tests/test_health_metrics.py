@@ -0,0 +1,23 @@
+"""Tests for health_metrics.py."""
+
+from health_metrics import HealthMetrics
+
+
+def _metrics(weight_kg=70, height_cm=170):
+    return HealthMetrics({
+        "age": 30, "gender": "Male", "height_cm": height_cm, "weight_kg": weight_kg,
+        "activity_level": "Moderately Active", "fitness_goal": "Maintenance",
+    })
+
+
+def test_bmi_category_buckets():
+    assert _metrics().bmi_category == {"label": "Normal Weight", "emoji": "🟢", "value": 24.2}
+    assert _metrics(weight_kg=100).bmi_category["label"] == "Obese Class I"
+
+
+def test_bmi_category_is_not_shared_between_callers():
+    metrics = _metrics()
+    first = metrics.bmi_category
+    first["label"] = "changed"
+    first["extra"] = 1
+    assert metrics.bmi_category == {"label": "Normal Weight", "emoji": "🟢", "value": 24.2}
@@ -0,0 +1,117 @@
+"""Tests for model_loader.py."""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from model_loader import ModelLoader, _safe_load, _search
+
+
+def _unit(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+# ─── Similarity search ────────────────────────────────────────────────────────
+
+@pytest.fixture
+def bank():
+    # Cosine against the query [1, 0, 0]: 1.0, 0.8, 0.6, 0.0, 0.2
+    return _unit([[1, 0, 0], [0.8, 0.6, 0], [0.6, 0.8, 0], [0, 0, 1], [0.2, 0, 0.98]])
+
+
+def test_search_top_k_best_first(bank):
+    assert _search(np.array([[1, 0, 0]], np.float32), bank, k=3) == [[0, 1, 2]]
+
+
+def test_search_threshold_drops_weak_matches(bank):
+    query = np.array([[1, 0, 0]], np.float32)
+    assert _search(query, bank, k=5) == [[0, 1, 2]]
+    assert _search(query, bank, k=5, threshold=0.7) == [[0, 1]]
+    assert _search(query, bank, k=5, threshold=0.1) == [[0, 1, 2, 4]]
+
+
+def test_search_k_larger_than_bank(bank):
+    assert _search(np.array([[0, 0, 1]], np.float32), bank, k=50) == [[3, 4]]
+
+
+
+def test_search_batches_match_single_queries(bank):
+    queries = np.array([[1, 0, 0], [0, 0, 1], [0, 1, 0]], np.float32)
+    assert _search(queries, bank, k=3) == [_search(q, bank, k=3)[0] for q in queries]
+
+
+# ─── joblib exports ───────────────────────────────────────────────────────────
+
+@pytest.fixture
+def source_pickle(tmp_path):
+    pytest.importorskip("joblib")
+    path = tmp_path / "scaler.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"mean": np.arange(4.0)}, f)
+    return path
+
+
+def test_fresh_export_is_loaded_read_only(source_pickle):
+    import joblib
+
+    joblib.dump({"mean": np.arange(4.0) + 1}, source_pickle.with_suffix(".joblib"))
+    loaded = _safe_load(str(source_pickle))
+    np.testing.assert_array_equal(loaded["mean"], np.arange(4.0) + 1)
+    assert not loaded["mean"].flags.writeable
+
+
+def test_corrupt_export_falls_back_to_source(source_pickle):
+    export = source_pickle.with_suffix(".joblib")
+    export.write_bytes(b"truncated")
+    mtime = os.path.getmtime(source_pickle) + 10
+    os.utime(export, (mtime, mtime))
+    np.testing.assert_array_equal(_safe_load(str(source_pickle))["mean"], np.arange(4.0))
+
+# ─── Stub-backed loader ───────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def stub_loader(tmp_path_factory):
+    return ModelLoader(str(tmp_path_factory.mktemp("no_models")))
+
+
+def test_cold_and_warm_candidate_bank_agree(stub_loader):
+    text = "omega-3 rich foods like flaxseed and walnuts"
+    warm = stub_loader.match_preferences(text, "Beginner", "Weight Loss")
+    stub_loader._cand_embs = None
+    assert stub_loader.match_preferences(text, "Beginner", "Weight Loss") == warm
+    assert stub_loader._cand_embs is not None
+
+
+def test_missing_models_build_one_warning(stub_loader):
+    assert len(stub_loader._warnings) == len(ModelLoader.MODEL_FILES)
+    assert stub_loader._warning_md.startswith("⚠️ **Demo mode**")
+    for filename in ModelLoader.MODEL_FILES.values():
+        assert f"- `{filename}`" in stub_loader._warning_md
+
+
+def test_match_preferences_batch_matches_single(stub_loader):
+    texts = ["vegan high protein", "low carb keto", "bad knees, no jumping"]
+    levels, goals = ["Beginner"] * 3, ["Weight Loss"] * 3
+    assert stub_loader.match_preferences_batch([], [], []) == []
+    assert stub_loader.match_preferences_batch(texts, levels, goals) == [
+        stub_loader.match_preferences(t, "Beginner", "Weight Loss") for t in texts
+    ]
+
+
+def test_queries_reach_search_unit_length(stub_loader, monkeypatch):
+    import model_loader
+
+    seen = []
+    real_search = model_loader._search
+
+    def spy(queries, bank):
+        seen.append(queries)
+        return real_search(queries, bank)
+
+    monkeypatch.setattr(model_loader, "_search", spy)
+    texts = ["vegan high protein", "low carb keto"]
+    stub_loader.match_preferences_batch(texts, ["Beginner"] * 2, ["Weight Loss"] * 2)
+    np.testing.assert_allclose(np.linalg.norm(seen[0], axis=1), 1.0, rtol=1e-5)
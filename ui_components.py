@@ -2,14 +2,14 @@
 
 from __future__ import annotations
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 import numpy as np
-import pandas as pd
 
 from health_metrics import ACTIVITY_MULTIPLIERS
+from planner import to_json
 
+# Shared figure layout, spread into each figure's own layout. It deliberately is
+# not registered as a plotly template: with theme="streamlit", Streamlit merges
+# its defaults over layout.template.layout, so these values would be lost.
 PLOTLY_LAYOUT = dict(
     paper_bgcolor="rgba(0,0,0,0)",
     plot_bgcolor="rgba(0,0,0,0)",
@@ -21,6 +21,9 @@ ACCENT_GREEN  = "#00ff88"
 ACCENT_ORANGE = "#ff6b35"
 ACCENT_BLUE   = "#4d9fff"
 
+# st.fragment graduated from st.experimental_fragment in Streamlit 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
 
 # ─── Header ───────────────────────────────────────────────────────────────────
 def render_header():
@@ -33,9 +36,24 @@ def render_header():
 
 
 # ─── User Input ───────────────────────────────────────────────────────────────
+_GENDER_OPTIONS    = ("Male", "Female", "Other")
+_ACTIVITY_OPTIONS  = tuple(ACTIVITY_MULTIPLIERS)
+_GOAL_OPTIONS      = ("Weight Loss", "Muscle Gain", "Endurance", "General Fitness", "Maintenance")
+_DIET_OPTIONS      = ("Non-Vegetarian", "Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo")
+_CULTURE_OPTIONS   = ("South Asian (Indian/Pakistani/Sri Lankan)", "East Asian (Chinese/Japanese/Korean)",
+                      "Southeast Asian (Thai/Vietnamese/Filipino)", "Middle Eastern",
+                      "Western (European/American)", "Latin American", "African")
+_EQUIPMENT_OPTIONS = ("Bodyweight", "Dumbbells", "Barbell", "Resistance Bands",
+                      "Machines", "Pull-up Bar", "Kettlebell")
+
+# Activity level / goal encoded for model
+_ACTIVITY_MAP = {k: i for i, k in enumerate(_ACTIVITY_OPTIONS)}
+_GOAL_MAP     = {k: i for i, k in enumerate(_GOAL_OPTIONS)}
+
+
 def render_user_input_section() -> dict:
     age    = st.slider("Age", 16, 80, 28, help="Your current age in years")
-    gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+    gender = st.selectbox("Gender", _GENDER_OPTIONS)
     height = st.number_input("Height (cm)", 140, 230, 170, step=1)
     weight = st.number_input("Weight (kg)", 30.0, 200.0, 70.0, step=0.5)
 
@@ -43,24 +61,22 @@ def render_user_input_section() -> dict:
 
     activity = st.selectbox(
         "Activity Level",
-        list(ACTIVITY_MULTIPLIERS.keys()),
+        _ACTIVITY_OPTIONS,
         index=2,
         help="Current weekly activity excluding planned workouts",
     )
     fitness_goal = st.selectbox(
         "Fitness Goal",
-        ["Weight Loss", "Muscle Gain", "Endurance", "General Fitness", "Maintenance"],
+        _GOAL_OPTIONS,
         index=0,
     )
     dietary_pref = st.selectbox(
         "Dietary Preference",
-        ["Non-Vegetarian", "Vegetarian", "Vegan", "Pescatarian", "Keto", "Paleo"],
+        _DIET_OPTIONS,
     )
     cultural_food = st.selectbox(
         "Cultural Food Habits",
-        ["South Asian (Indian/Pakistani/Sri Lankan)", "East Asian (Chinese/Japanese/Korean)",
-         "Southeast Asian (Thai/Vietnamese/Filipino)", "Middle Eastern",
-         "Western (European/American)", "Latin American", "African"],
+        _CULTURE_OPTIONS,
         index=4,
     )
 
@@ -69,8 +85,7 @@ def render_user_input_section() -> dict:
     budget = st.number_input("Daily Food Budget (USD $)", 2.0, 50.0, 10.0, step=0.5)
     equipment = st.multiselect(
         "Available Equipment",
-        ["Bodyweight", "Dumbbells", "Barbell", "Resistance Bands",
-         "Machines", "Pull-up Bar", "Kettlebell"],
+        _EQUIPMENT_OPTIONS,
         default=["Bodyweight", "Dumbbells"],
     )
     if not equipment:
@@ -85,20 +100,15 @@ def render_user_input_section() -> dict:
         help="AI will use NLP to incorporate these into your plan",
     )
 
-    # Activity level encoded for model
-    activity_map = {k: i for i, k in enumerate(ACTIVITY_MULTIPLIERS.keys())}
-    goal_map     = {"Weight Loss": 0, "Muscle Gain": 1, "Endurance": 2,
-                    "General Fitness": 3, "Maintenance": 4}
-
     return {
         "age":                    age,
         "gender":                 gender,
         "height_cm":              height,
         "weight_kg":              weight,
         "activity_level":         activity,
-        "activity_level_encoded": activity_map.get(activity, 2),
+        "activity_level_encoded": _ACTIVITY_MAP.get(activity, 2),
         "fitness_goal":           fitness_goal,
-        "fitness_goal_encoded":   goal_map.get(fitness_goal, 3),
+        "fitness_goal_encoded":   _GOAL_MAP.get(fitness_goal, 3),
         "dietary_preference":     dietary_pref,
         "cultural_food_habits":   cultural_food,
         "budget_usd_per_day":     budget,
@@ -114,35 +124,30 @@ def render_health_metrics_dashboard(plan: dict):
 
     bmi_cat = plan["bmi_category"]
 
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.markdown(f"""
+    # All four cards in one markdown call, laid out by the .metric-grid CSS
+    st.markdown(f"""
+    <div class="metric-grid">
         <div class="metric-card">
             <div class="metric-label">BMI</div>
             <div class="metric-value">{plan['bmi']}</div>
             <div class="metric-unit">{bmi_cat['emoji']} {bmi_cat['label']}</div>
-        </div>""", unsafe_allow_html=True)
-    with col2:
-        st.markdown(f"""
+        </div>
         <div class="metric-card orange">
             <div class="metric-label">BMR</div>
             <div class="metric-value orange">{plan['bmr']:.0f}</div>
             <div class="metric-unit">kcal / day (at rest)</div>
-        </div>""", unsafe_allow_html=True)
-    with col3:
-        st.markdown(f"""
+        </div>
         <div class="metric-card blue">
             <div class="metric-label">TDEE</div>
             <div class="metric-value blue">{plan['tdee']:.0f}</div>
             <div class="metric-unit">kcal / day (total expenditure)</div>
-        </div>""", unsafe_allow_html=True)
-    with col4:
-        st.markdown(f"""
+        </div>
         <div class="metric-card">
             <div class="metric-label">Predicted Calories</div>
             <div class="metric-value">{plan['predicted_calories']:.0f}</div>
             <div class="metric-unit">kcal / day (AI model)</div>
-        </div>""", unsafe_allow_html=True)
+        </div>
+    </div>""", unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -158,7 +163,25 @@ def render_health_metrics_dashboard(plan: dict):
 
         # Macro donut
         macros = plan["macros"]
-        fig = go.Figure(go.Pie(
+        st.plotly_chart(_macro_donut_fig(macros, plan["predicted_calories"]),
+                        use_container_width=True)
+
+    with col_r:
+        # Plain bars: a Vega-Lite spec is far lighter than a Plotly figure
+        st.vega_lite_chart(_macro_bars_spec(macros), use_container_width=True)
+
+
+# Figures are cached as shared objects (cache_resource) rather than pickled
+# copies; st.plotly_chart only serialises them, so they are never mutated.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _macro_donut_fig(macros: dict, kcal: float):
+    # plotly is imported lazily so the landing page doesn't pay for it
+    import plotly.graph_objects as go
+
+    # Hand-written specs: skip plotly's per-property validation
+    return go.Figure(
+        data=[dict(
+            type="pie",
             labels=["Protein", "Carbs", "Fat"],
             values=[macros["protein_pct"], macros["carbs_pct"], macros["fat_pct"]],
             hole=0.65,
@@ -167,48 +190,87 @@ def render_health_metrics_dashboard(plan: dict):
             textinfo="label+percent",
             textfont=dict(size=12),
             hovertemplate="<b>%{label}</b><br>%{value*100:.0f}%<extra></extra>",
-        ))
-        fig.update_layout(
+        )],
+        layout=dict(
             **PLOTLY_LAYOUT,
             title=dict(text="Macro Split", font=dict(size=14, color="#6b6b8a")),
             showlegend=False,
             height=260,
-            annotations=[dict(text=f"{plan['predicted_calories']:.0f}<br>kcal",
+            annotations=[dict(text=f"{kcal:.0f}<br>kcal",
                               x=0.5, y=0.5, showarrow=False,
                               font=dict(size=16, color=ACCENT_GREEN))],
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        ),
+        _validate=False,
+    )
 
-    with col_r:
-        # Macro grams bar chart
-        macro_df = pd.DataFrame({
-            "Macro":   ["Protein", "Carbs", "Fat"],
-            "Grams":   [macros["protein_g"], macros["carbs_g"], macros["fat_g"]],
-            "Calories":[macros["protein_g"]*4, macros["carbs_g"]*4, macros["fat_g"]*9],
-        })
-        fig2 = go.Figure()
-        colors = [ACCENT_GREEN, ACCENT_BLUE, ACCENT_ORANGE]
-        for i, row in macro_df.iterrows():
-            fig2.add_trace(go.Bar(
-                name=row["Macro"], x=[row["Macro"]], y=[row["Grams"]],
-                marker_color=colors[i],
-                text=[f"{row['Grams']}g<br>({row['Calories']:.0f} kcal)"],
-                textposition="inside",
-                textfont=dict(color="#0a0a0f", size=11),
-            ))
-        fig2.update_layout(
-            **PLOTLY_LAYOUT,
-            showlegend=False,
-            barmode="group",
-            title=dict(text="Daily Macros (grams)", font=dict(size=14, color="#6b6b8a")),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor="#2a2a3d", title="Grams"),
-            height=260,
-        )
-        st.plotly_chart(fig2, use_container_width=True)
+
+def _labelled_bars_spec(title: str, rows: list, height: int) -> dict:
+    """
+    Vega-Lite bars for rows of {"x", "y", "label", "color"}: drawn in row
+    order, each in its own colour, with its label above the bar.
+    """
+    return {
+        "title": title,
+        "height": height,
+        "data": {"values": rows},
+        "encoding": {
+            "x": {"field": "x", "type": "nominal", "sort": None, "title": None,
+                  "axis": {"labelAngle": 0}},
+            "y": {"field": "y", "type": "quantitative", "title": None},
+        },
+        "layer": [
+            {"mark": {"type": "bar"},
+             "encoding": {"color": {"field": "color", "type": "nominal",
+                                    "scale": None, "legend": None}}},
+            {"mark": {"type": "text", "baseline": "bottom", "dy": -4, "lineBreak": "\n"},
+             "encoding": {"text": {"field": "label"}}},
+        ],
+    }
+
+
+def _macro_bars_spec(macros: dict) -> dict:
+    grams  = (macros["protein_g"], macros["carbs_g"], macros["fat_g"])
+    kcals  = (grams[0] * 4, grams[1] * 4, grams[2] * 9)
+    names  = ("Protein", "Carbs", "Fat")
+    colors = (ACCENT_GREEN, ACCENT_BLUE, ACCENT_ORANGE)
+    return _labelled_bars_spec("Daily Macros (grams)", [
+        {"x": n, "y": g, "label": f"{g}g\n({k:.0f} kcal)", "color": c}
+        for n, g, k, c in zip(names, grams, kcals, colors)
+    ], height=220)
 
 
 # ─── Workout Plan ─────────────────────────────────────────────────────────────
+# One exercise row; fields are read off the Exercise namedtuple passed as {0}
+_EX_ROW_TPL = (
+    '<div class="exercise-row">'
+    '  <span class="ex-name">→ {0.name}</span>'
+    '  <span class="ex-sets">{0.sets}</span>'
+    '  <span class="ex-muscle">{0.muscle}</span>'
+    '</div>'
+)
+
+# Day cards; {0} is the WorkoutDay, {1} the joined exercise rows (workout days only)
+_REST_DAY_TPL = (
+    '<div class="day-card" style="opacity:0.6;">'
+    '  <div class="day-title">🛌 {0.day} — {0.focus}</div>'
+    '  <div style="color:var(--text-muted);font-size:0.88rem;">{0.notes}</div>'
+    '</div>'
+)
+_WORKOUT_DAY_TPL = (
+    '<div class="day-card">'
+    '  <div class="day-title">⚡ {0.day} — {0.focus}'
+    '    <span style="float:right;font-size:0.75rem;color:var(--text-muted);">'
+    '      ~{0.duration_min} min'
+    '    </span>'
+    '  </div>'
+    '  {1}'
+    '  <div style="margin-top:0.8rem;font-size:0.80rem;color:var(--text-muted);">'
+    '    💡 {0.notes}'
+    '  </div>'
+    '</div>'
+)
+
+
 def render_workout_plan(plan: dict, user_data: dict):
     st.markdown('<div class="section-header">🏋️ Weekly Workout Plan</div>',
                 unsafe_allow_html=True)
@@ -235,33 +297,12 @@ def render_workout_plan(plan: dict, user_data: dict):
     cols = st.columns(2)
     for i, day_data in enumerate(plan["workout_plan"]):
         with cols[i % 2]:
-            if day_data["type"] == "rest":
-                st.markdown(f"""
-                <div class="day-card" style="opacity:0.6;">
-                    <div class="day-title">🛌 {day_data['day']} — {day_data['focus']}</div>
-                    <div style="color:var(--text-muted);font-size:0.88rem;">{day_data['notes']}</div>
-                </div>""", unsafe_allow_html=True)
+            if day_data.type == "rest":
+                card = _REST_DAY_TPL.format(day_data)
             else:
-                ex_html = "".join([
-                    f'<div class="exercise-row">'
-                    f'  <span class="ex-name">→ {ex["name"]}</span>'
-                    f'  <span class="ex-sets">{ex["sets"]}</span>'
-                    f'  <span class="ex-muscle">{ex["muscle"]}</span>'
-                    f'</div>'
-                    for ex in day_data["exercises"]
-                ])
-                st.markdown(f"""
-                <div class="day-card">
-                    <div class="day-title">⚡ {day_data['day']} — {day_data['focus']}
-                        <span style="float:right;font-size:0.75rem;color:var(--text-muted);">
-                            ~{day_data['duration_min']} min
-                        </span>
-                    </div>
-                    {ex_html}
-                    <div style="margin-top:0.8rem;font-size:0.80rem;color:var(--text-muted);">
-                        💡 {day_data['notes']}
-                    </div>
-                </div>""", unsafe_allow_html=True)
+                ex_html = "".join(map(_EX_ROW_TPL.format, day_data.exercises))
+                card = _WORKOUT_DAY_TPL.format(day_data, ex_html)
+            st.markdown(card, unsafe_allow_html=True)
 
 
 # ─── Diet Plan ────────────────────────────────────────────────────────────────
@@ -279,61 +320,78 @@ def render_diet_plan(plan: dict, user_data: dict):
             Budget: <b>${user_data['budget_usd_per_day']:.2f}/day</b>
         </div>""", unsafe_allow_html=True)
     with col_budget:
-        daily_cost = sum(m["cost"] for m in diet["weekly_plan"][0]["meals"])
-        st.metric("Est. Daily Cost", f"${daily_cost:.2f}", delta=None)
+        st.metric("Est. Daily Cost", f"${diet.daily_costs[0]:.2f}", delta=None)
 
-    if diet.get("nlp_adjustment"):
-        st.markdown(f'<div class="nlp-note">🍽️ Dietary Adjustment: {diet["nlp_adjustment"]}</div>',
+    if diet.nlp_adjustment:
+        st.markdown(f'<div class="nlp-note">🍽️ Dietary Adjustment: {diet.nlp_adjustment}</div>',
                     unsafe_allow_html=True)
 
-    # Day selector
-    selected_day = st.select_slider(
-        "View Day", options=[d["day"] for d in diet["weekly_plan"]], value="Monday"
+    _render_diet_day(diet.weekly_plan)
+
+    # Weekly overview table
+    st.markdown("<br>**📊 Weekly Meal Overview**", unsafe_allow_html=True)
+    st.dataframe(
+        _weekly_meals_df(diet.weekly_plan),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Calories": st.column_config.NumberColumn(format="%d kcal"),
+            "Protein":  st.column_config.NumberColumn(format="%dg"),
+            "Carbs":    st.column_config.NumberColumn(format="%dg"),
+            "Fat":      st.column_config.NumberColumn(format="%dg"),
+            "Cost ($)": st.column_config.NumberColumn(format="$%.2f"),
+        }
+    )
+
+
+@_fragment
+def _render_diet_day(weekly_plan: list):
+    """Day selector and meal cards; a fragment, so the slider reruns only this block."""
+    # Options are day positions, so the selection indexes weekly_plan directly
+    day_i = st.select_slider(
+        "View Day", options=range(len(weekly_plan)), value=0,
+        format_func=lambda i: weekly_plan[i].day,
     )
 
-    day_plan = next(d for d in diet["weekly_plan"] if d["day"] == selected_day)
-    st.markdown(f"<br>**📅 {selected_day}**", unsafe_allow_html=True)
+    day_plan = weekly_plan[day_i]
+    st.markdown(f"<br>**📅 {day_plan.day}**", unsafe_allow_html=True)
 
-    meal_cols = st.columns(len(day_plan["meals"]))
-    for col, meal in zip(meal_cols, day_plan["meals"]):
+    meal_cols = st.columns(len(day_plan.meals))
+    for col, meal in zip(meal_cols, day_plan.meals):
         with col:
             st.markdown(f"""
             <div class="meal-card">
-                <div class="meal-title">{meal['name']}
-                    <span class="meal-calories">{meal['calories']} kcal</span>
+                <div class="meal-title">{meal.name}
+                    <span class="meal-calories">{meal.calories} kcal</span>
                 </div>
-                <div style="font-size:0.88rem;margin-top:0.8rem;color:var(--text);">{meal['item']}</div>
+                <div style="font-size:0.88rem;margin-top:0.8rem;color:var(--text);">{meal.item}</div>
                 <div style="margin-top:0.8rem;font-size:0.78rem;color:var(--text-muted);">
-                    🥩 {meal['protein']}g protein &nbsp;
-                    🍞 {meal['carbs']}g carbs &nbsp;
-                    🧴 {meal['fat']}g fat
+                    🥩 {meal.protein}g protein &nbsp;
+                    🍞 {meal.carbs}g carbs &nbsp;
+                    🧴 {meal.fat}g fat
                 </div>
             </div>""", unsafe_allow_html=True)
 
-    # Weekly overview table
-    st.markdown("<br>**📊 Weekly Meal Overview**", unsafe_allow_html=True)
-    rows = []
-    for day_data in diet["weekly_plan"]:
-        for meal in day_data["meals"]:
-            rows.append({
-                "Day":      day_data["day"],
-                "Meal":     meal["name"],
-                "Item":     meal["item"],
-                "Calories": meal["calories"],
-                "Protein":  f"{meal['protein']}g",
-                "Carbs":    f"{meal['carbs']}g",
-                "Fat":      f"{meal['fat']}g",
-                "Cost ($)": f"${meal['cost']:.2f}",
-            })
-    df = pd.DataFrame(rows)
-    st.dataframe(
-        df,
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            "Calories": st.column_config.NumberColumn(format="%d kcal"),
-        }
-    )
+
+@st.cache_data(show_spinner=False)
+def _weekly_meals_df(weekly_plan: list):
+    """Weekly overview table; numeric columns, formatted by the column_config."""
+    import pandas as pd
+
+    pairs = [(d.day, m) for d in weekly_plan for m in d.meals]
+    meals = [m for _, m in pairs]
+    # Built column-wise with fixed dtypes; the repeated Day/Meal labels are
+    # categoricals, which Arrow sends dictionary-encoded
+    return pd.DataFrame({
+        "Day":      pd.Categorical([day for day, _ in pairs]),
+        "Meal":     pd.Categorical([m.name for m in meals]),
+        "Item":     [m.item for m in meals],
+        "Calories": np.fromiter((m.calories for m in meals), np.int64, len(meals)),
+        "Protein":  np.fromiter((m.protein for m in meals), np.int64, len(meals)),
+        "Carbs":    np.fromiter((m.carbs for m in meals), np.int64, len(meals)),
+        "Fat":      np.fromiter((m.fat for m in meals), np.int64, len(meals)),
+        "Cost ($)": np.fromiter((m.cost for m in meals), np.float64, len(meals)),
+    })
 
 
 # ─── Calorie Balance Visualization ────────────────────────────────────────────
@@ -362,89 +420,134 @@ def render_calorie_visualization(plan: dict):
     col_l, col_r = st.columns(2)
 
     with col_l:
-        # Grouped bar: TDEE vs Target vs Net-after-workout
-        categories = ["TDEE", "Target Intake", "Net After Workout"]
-        values     = [tdee, predicted, predicted - daily_burn]
-        colors     = [ACCENT_ORANGE, ACCENT_GREEN, ACCENT_BLUE]
-        fig = go.Figure(go.Bar(
-            x=categories, y=values,
-            marker_color=colors,
-            text=[f"{v:.0f}" for v in values],
-            textposition="outside",
-            textfont=dict(color="#e8e8f0"),
-        ))
-        fig.update_layout(
-            **PLOTLY_LAYOUT,
-            title="Calorie Comparison",
-            yaxis=dict(showgrid=True, gridcolor="#2a2a3d"),
-            xaxis=dict(showgrid=False),
-            height=320,
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.vega_lite_chart(_calorie_comparison_spec(tdee, predicted, daily_burn),
+                           use_container_width=True)
 
     with col_r:
-        # Weekly accumulation line chart
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        burns = []
-        cum_net = 0
-        cum_nets = []
-        for i, day in enumerate(plan.get("workout_plan", [])):
-            b = daily_burn * 1.5 if day.get("type") == "workout" else daily_burn * 0.3
-            burns.append(b)
-            cum_net += (predicted - tdee - b)
-            cum_nets.append(cum_net)
-
-        fig2 = make_subplots(specs=[[{"secondary_y": True}]])
-        fig2.add_trace(go.Bar(
-            x=days, y=burns, name="Workout Burn",
-            marker_color=ACCENT_ORANGE, opacity=0.7
-        ), secondary_y=False)
-        fig2.add_trace(go.Scatter(
-            x=days, y=cum_nets, name="Cumulative Balance",
-            mode="lines+markers", line=dict(color=ACCENT_GREEN, width=2.5),
-            marker=dict(size=7),
-        ), secondary_y=True)
-        fig2.update_layout(
+        day_types = tuple(day.type for day in plan.get("workout_plan", []))
+        st.plotly_chart(_weekly_balance_fig(day_types, tdee, predicted, daily_burn),
+                        use_container_width=True)
+
+    st.plotly_chart(_macro_waterfall_fig(plan["macros"]), use_container_width=True)
+
+
+def _calorie_comparison_spec(tdee: float, predicted: float, daily_burn: float) -> dict:
+    # TDEE vs Target vs Net-after-workout
+    categories = ("TDEE", "Target Intake", "Net After Workout")
+    values     = (tdee, predicted, predicted - daily_burn)
+    colors     = (ACCENT_ORANGE, ACCENT_GREEN, ACCENT_BLUE)
+    return _labelled_bars_spec("Calorie Comparison", [
+        {"x": n, "y": v, "label": f"{v:.0f}", "color": c}
+        for n, v, c in zip(categories, values, colors)
+    ], height=280)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _weekly_balance_fig(day_types: tuple, tdee: float, predicted: float, daily_burn: float):
+    import plotly.graph_objects as go
+
+    # Weekly accumulation line chart
+    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    is_workout = np.array(day_types) == "workout"
+    burns    = np.where(is_workout, daily_burn * 1.5, daily_burn * 0.3)
+    cum_nets = np.cumsum(predicted - tdee - burns)
+
+    # Secondary y-axis laid out by hand, matching make_subplots(secondary_y=True)
+    return go.Figure(
+        data=[
+            dict(
+                type="bar", x=days, y=burns.tolist(), name="Workout Burn",
+                marker=dict(color=ACCENT_ORANGE), opacity=0.7,
+                xaxis="x", yaxis="y",
+            ),
+            dict(
+                type="scatter", x=days, y=cum_nets.tolist(), name="Cumulative Balance",
+                mode="lines+markers", line=dict(color=ACCENT_GREEN, width=2.5),
+                marker=dict(size=7),
+                xaxis="x", yaxis="y2",
+            ),
+        ],
+        layout=dict(
             **PLOTLY_LAYOUT,
-            title="Weekly Burn & Cumulative Balance",
+            title=dict(text="Weekly Burn & Cumulative Balance"),
             legend=dict(x=0.01, y=0.99, bgcolor="rgba(0,0,0,0)"),
             height=320,
-        )
-        fig2.update_yaxes(title_text="Burn (kcal)", secondary_y=False,
-                          gridcolor="#2a2a3d")
-        fig2.update_yaxes(title_text="Cumulative (kcal)", secondary_y=True,
-                          showgrid=False)
-        st.plotly_chart(fig2, use_container_width=True)
+            xaxis=dict(anchor="y", domain=[0.0, 0.94]),
+            yaxis=dict(anchor="x", domain=[0.0, 1.0],
+                       title=dict(text="Burn (kcal)"), gridcolor="#2a2a3d"),
+            yaxis2=dict(anchor="x", overlaying="y", side="right",
+                        title=dict(text="Cumulative (kcal)"), showgrid=False),
+        ),
+        _validate=False,
+    )
+
+
+# Waterfall bar labels: the two relative steps are shown with a leading "+"
+_WATERFALL_TEXT_FMT = np.array(["%.0f", "+%.0f", "+%.0f", "%.0f"])
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _macro_waterfall_fig(macros: dict):
+    import plotly.graph_objects as go
 
     # Macro energy waterfall
-    macros = plan["macros"]
     protein_cal = macros["protein_g"] * 4
     carbs_cal   = macros["carbs_g"]   * 4
     fat_cal     = macros["fat_g"]     * 9
     total        = protein_cal + carbs_cal + fat_cal
 
-    fig3 = go.Figure(go.Waterfall(
-        orientation="v",
-        measure=["absolute", "relative", "relative", "total"],
-        x=["Protein", "Carbs", "Fat", "Total"],
-        y=[protein_cal, carbs_cal, fat_cal, 0],
-        text=[f"{protein_cal:.0f}", f"+{carbs_cal:.0f}", f"+{fat_cal:.0f}", f"{total:.0f}"],
-        textposition="outside",
-        connector=dict(line=dict(color="#2a2a3d")),
-        increasing=dict(marker=dict(color=ACCENT_GREEN)),
-        decreasing=dict(marker=dict(color=ACCENT_ORANGE)),
-        totals=dict(marker=dict(color=ACCENT_BLUE)),
-    ))
-    fig3.update_layout(
-        **PLOTLY_LAYOUT,
-        title="Calories by Macronutrient",
-        yaxis=dict(showgrid=True, gridcolor="#2a2a3d"),
-        height=280,
+    return go.Figure(
+        data=[dict(
+            type="waterfall",
+            orientation="v",
+            measure=["absolute", "relative", "relative", "total"],
+            x=["Protein", "Carbs", "Fat", "Total"],
+            y=[protein_cal, carbs_cal, fat_cal, 0],
+            text=np.char.mod(_WATERFALL_TEXT_FMT,
+                             [protein_cal, carbs_cal, fat_cal, total]).tolist(),
+            textposition="outside",
+            connector=dict(line=dict(color="#2a2a3d")),
+            increasing=dict(marker=dict(color=ACCENT_GREEN)),
+            decreasing=dict(marker=dict(color=ACCENT_ORANGE)),
+            totals=dict(marker=dict(color=ACCENT_BLUE)),
+        )],
+        layout=dict(
+            **PLOTLY_LAYOUT,
+            title=dict(text="Calories by Macronutrient"),
+            yaxis=dict(showgrid=True, gridcolor="#2a2a3d"),
+            height=280,
+        ),
+        _validate=False,
     )
-    st.plotly_chart(fig3, use_container_width=True)
 
 
 # ─── Explainability / AI Insights ─────────────────────────────────────────────
+# Why each goal's macro split looks the way it does (shown under the rationale header)
+_GOAL_RATIONALE = {
+    "Weight Loss":     "High protein (35%) preserves lean mass during deficit. Moderate carbs fuel workouts; healthy fats support hormonal function.",
+    "Muscle Gain":     "Elevated carbs (45%) fuel hypertrophy training sessions. High protein supports muscle protein synthesis. Moderate fat for hormone production.",
+    "Endurance":       "Carbohydrate-dominant (55%) macro split fuels aerobic systems. Lower protein sufficient for endurance athletes. Controlled fat for sustained energy.",
+    "General Fitness": "Balanced split supporting overall health, energy, and recovery.",
+    "Maintenance":     "Maintenance split mirrors General Fitness — sustaining current body composition.",
+}
+
+
+_CLUSTER_DETAIL = (
+    "**K-Means Clustering Logic:**\n"
+    "Features used: Age, Gender, Height, Weight, BMI, BMR, TDEE, Activity Level\n"
+    "→ Scaled by `scaler.pkl` → 4-cluster KMeans → Fitness Level label assigned"
+)
+_CALORIE_DETAIL = (
+    "**Decision Tree Regressor Logic:**\n"
+    "Features preprocessed by `calorie_preprocessor.pkl` (encodes categoricals, \n"
+    "scales numerics) → DTR predicts exact daily calorie target based on goal & profile"
+)
+_NO_PREFS_DETAIL = (
+    '<div class="info-box">No free-text preferences were provided. Add injuries, '
+    "tastes, or constraints in the sidebar to activate NLP matching.</div>"
+)
+
+
 def render_explainability_section(plan: dict, user_data: dict):
     st.markdown('<div class="section-header">🧠 AI Insights & Explainability</div>',
                 unsafe_allow_html=True)
@@ -465,50 +568,49 @@ def render_explainability_section(plan: dict, user_data: dict):
          f"{', '.join(user_data['available_equipment'])}"),
     ]
 
-    for step, method, outcome in pipeline_steps:
-        with st.expander(f"{step} — {method}"):
-            st.markdown(f"**Outcome:** {outcome}")
-            if step.startswith("2"):
-                st.markdown("""
-                **K-Means Clustering Logic:**
-                Features used: Age, Gender, Height, Weight, BMI, BMR, TDEE, Activity Level
-                → Scaled by `scaler.pkl` → 4-cluster KMeans → Fitness Level label assigned
-                """)
-            elif step.startswith("3"):
-                st.markdown("""
-                **Decision Tree Regressor Logic:**
-                Features preprocessed by `calorie_preprocessor.pkl` (encodes categoricals, 
-                scales numerics) → DTR predicts exact daily calorie target based on goal & profile
-                """)
-            elif step.startswith("4"):
-                if plan.get("embedding_notes"):
-                    for note in plan["embedding_notes"]:
-                        st.markdown(f"- {note}")
-                else:
-                    st.info("No free-text preferences were provided. Add injuries, tastes, or constraints in the sidebar to activate NLP matching.")
+    # Extra detail per step, keyed by the step's leading digit
+    notes = plan.get("embedding_notes")
+    extras = {
+        "2": _CLUSTER_DETAIL,
+        "3": _CALORIE_DETAIL,
+        "4": "\n".join(f"- {note}" for note in notes) if notes else _NO_PREFS_DETAIL,
+    }
+
+    # One markdown element of native <details> blocks instead of five expanders;
+    # the blank lines let the markdown inside each block render
+    st.markdown("\n".join(
+        f'<details class="pipeline-step"><summary>{step} — {method}</summary>\n\n'
+        f'**Outcome:** {outcome}\n\n{extras.get(step[0], "")}\n\n</details>'
+        for step, method, outcome in pipeline_steps
+    ), unsafe_allow_html=True)
 
     # Macro rationale
     st.markdown("### Macro Target Rationale")
     macros = plan["macros"]
     goal   = user_data["fitness_goal"]
+    st.info(f"**{goal}:** {_GOAL_RATIONALE.get(goal, '')}")
 
-    rationale = {
-        "Weight Loss":     "High protein (35%) preserves lean mass during deficit. Moderate carbs fuel workouts; healthy fats support hormonal function.",
-        "Muscle Gain":     "Elevated carbs (45%) fuel hypertrophy training sessions. High protein supports muscle protein synthesis. Moderate fat for hormone production.",
-        "Endurance":       "Carbohydrate-dominant (55%) macro split fuels aerobic systems. Lower protein sufficient for endurance athletes. Controlled fat for sustained energy.",
-        "General Fitness": "Balanced split supporting overall health, energy, and recovery.",
-        "Maintenance":     "Maintenance split mirrors General Fitness — sustaining current body composition.",
-    }
-    st.info(f"**{goal}:** {rationale.get(goal, '')}")
-
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Protein Target", f"{macros['protein_g']}g", f"{macros['protein_pct']*100:.0f}% of calories")
-    col2.metric("Carbs Target",   f"{macros['carbs_g']}g",   f"{macros['carbs_pct']*100:.0f}% of calories")
-    col3.metric("Fat Target",     f"{macros['fat_g']}g",     f"{macros['fat_pct']*100:.0f}% of calories")
+    st.markdown(f"""
+    <div class="metric-grid cols-3">
+        <div class="metric-card">
+            <div class="metric-label">Protein Target</div>
+            <div class="metric-value">{macros['protein_g']}g</div>
+            <div class="metric-unit">{macros['protein_pct']*100:.0f}% of calories</div>
+        </div>
+        <div class="metric-card blue">
+            <div class="metric-label">Carbs Target</div>
+            <div class="metric-value blue">{macros['carbs_g']}g</div>
+            <div class="metric-unit">{macros['carbs_pct']*100:.0f}% of calories</div>
+        </div>
+        <div class="metric-card orange">
+            <div class="metric-label">Fat Target</div>
+            <div class="metric-value orange">{macros['fat_g']}g</div>
+            <div class="metric-unit">{macros['fat_pct']*100:.0f}% of calories</div>
+        </div>
+    </div>""", unsafe_allow_html=True)
 
     # Full plan JSON export
     st.markdown("### 📥 Export Plan Data")
-    import json
     export_data = {
         "user_profile":    {k: v for k, v in user_data.items() if k != "free_text_prefs"},
         "health_metrics":  {
@@ -518,13 +620,19 @@ def render_explainability_section(plan: dict, user_data: dict):
         },
         "targets": {"daily_calories": plan["predicted_calories"], "macros": plan["macros"]},
         "workout_summary": [
-            {"day": d["day"], "focus": d["focus"], "type": d["type"]}
+            {"day": d.day, "focus": d.focus, "type": d.type}
             for d in plan["workout_plan"]
         ],
     }
     st.download_button(
         "📥 Download Plan (JSON)",
-        data=json.dumps(export_data, indent=2),
+        data=_export_bytes(export_data),
         file_name="ai_fitness_plan.json",
         mime="application/json",
     )
+
+
+@st.cache_data(show_spinner=False)
+def _export_bytes(export_data: dict) -> bytes:
+    """Serialised plan export; cached so reruns don't re-encode it."""
+    return to_json(export_data, indent=True)